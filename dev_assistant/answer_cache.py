@@ -0,0 +1,199 @@
+import collections
+import hashlib
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+# Bumped by ingestion whenever the index changes; cached answers from an
+# older generation are dropped
+INDEX_GENERATION_PATH = os.getenv(
+    "INDEX_GENERATION_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".index_generation"))
+
+# Cosine similarity above which two questions count as the same
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))
+
+
+# Questions that differ only in the language asked for embed very closely,
+# but need different code; a hit must name the same languages
+LANGUAGE_PATTERN = re.compile(
+    r"(?<![\w#.])(go|golang|node(?:\.?js)?|javascript|js|typescript|ts|python|php|java|"
+    r"kotlin|c#|csharp|\.net|ruby|rust|swift|dart|flutter|curl)(?![\w#])", re.IGNORECASE)
+LANGUAGE_ALIASES = {'golang': 'go', 'nodejs': 'node', 'node.js': 'node', 'js': 'javascript',
+                    'ts': 'typescript', 'csharp': 'c#'}
+
+
+def languages(question):
+    found = (match.lower() for match in LANGUAGE_PATTERN.findall(question))
+    return frozenset(LANGUAGE_ALIASES.get(name, name) for name in found)
+
+
+def index_generation(path=INDEX_GENERATION_PATH):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return ""
+
+
+def bump_index_generation(path=INDEX_GENERATION_PATH):
+    """Mark the index as changed, invalidating every cached answer"""
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(f"{time.time_ns()}")
+    os.replace(tmp, path)
+
+
+def context_fingerprint(documents):
+    """Hash of the retrieved chunks, in order"""
+    digest = hashlib.sha256()
+    for doc in documents:
+        digest.update(doc.page_content.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class AnswerCache:
+    """Answers to earlier questions, reused for near-identical new ones
+
+    A hit needs a stored question whose embedding is within threshold
+    cosine similarity, that names the same programming languages, and
+    whose retrieved context was the same, so an answer is never reused
+    once the documentation behind it changed. Entries expire after ttl
+    seconds; when full, the least recently used one is replaced. Question
+    vectors sit in one preallocated matrix, so a lookup is a single
+    matrix-vector product. With exact=True (context from the endpoint
+    index) the question text itself is the key, so neither lookup nor
+    store calls the embedding model.
+    """
+
+    def __init__(self, embeddings, threshold=ANSWER_CACHE_THRESHOLD, max_entries=ANSWER_CACHE_SIZE,
+                 ttl=ANSWER_CACHE_TTL, generation=index_generation):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = generation
+        self._generation = generation()
+        self._vectors = None
+        self._entries = [None] * max_entries
+        self._last_used = np.zeros(max_entries)
+        self._expires = np.zeros(max_entries)
+        self._size = 0
+        self._exact = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.lookups = self.hits = self.evictions = self.invalidations = 0
+        self.seconds_saved = 0.0
+
+    def _embed(self, question):
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _check_generation(self):
+        current = self.generation()
+        if current != self._generation:
+            self._generation = current
+            self._size = 0
+            self._entries = [None] * self.max_entries
+            self._exact.clear()
+            self.invalidations += 1
+
+    @staticmethod
+    def _exact_key(question, documents):
+        return ' '.join(question.lower().split()), context_fingerprint(documents)
+
+    def _lookup_exact(self, question, documents):
+        key = self._exact_key(question, documents)
+        with self._lock:
+            self.lookups += 1
+            self._check_generation()
+            entry = self._exact.get(key)
+            if entry is None or entry[2] < time.monotonic():
+                return None
+            self._exact.move_to_end(key)
+            self.hits += 1
+            self.seconds_saved += entry[1]
+            return entry[0]
+
+    def lookup(self, question, documents, exact=False):
+        """Return the cached answer for question given its retrieved documents, or None
+
+        exact=True only matches the same question text, without embedding it.
+        """
+        if exact:
+            return self._lookup_exact(question, documents)
+        vector = self._embed(question)
+        fingerprint = (context_fingerprint(documents), languages(question))
+        now = time.monotonic()
+        with self._lock:
+            self.lookups += 1
+            self._check_generation()
+            if not self._size:
+                return None
+            scores = self._vectors[:self._size] @ vector
+            scores[self._expires[:self._size] < now] = -1
+            for slot in np.argsort(-scores):
+                if scores[slot] < self.threshold:
+                    break
+                answer, context, seconds = self._entries[slot]
+                if context == fingerprint:
+                    self.hits += 1
+                    self.seconds_saved += seconds
+                    self._last_used[slot] = now
+                    return answer
+            return None
+
+    def store(self, question, documents, answer, seconds=0.0, exact=False):
+        """Remember answer; seconds is what generating it took"""
+        if not self.max_entries:
+            return
+        if exact:
+            key = self._exact_key(question, documents)
+            with self._lock:
+                self._check_generation()
+                self._exact[key] = (answer, seconds, time.monotonic() + self.ttl)
+                self._exact.move_to_end(key)
+                if len(self._exact) > self.max_entries:
+                    self._exact.popitem(last=False)
+                    self.evictions += 1
+            return
+        vector = self._embed(question)
+        now = time.monotonic()
+        with self._lock:
+            self._check_generation()
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+            if self._size < self.max_entries:
+                slot = self._size
+                self._size += 1
+            else:
+                # Expired entries go first, then the least recently used
+                expired = np.flatnonzero(self._expires < now)
+                slot = int(expired[0]) if len(expired) else int(self._last_used.argmin())
+                self.evictions += 1
+            self._vectors[slot] = vector
+            self._entries[slot] = (answer, (context_fingerprint(documents), languages(question)),
+                                   seconds)
+            self._last_used[slot] = now
+            self._expires[slot] = now + self.ttl
+
+    def clear(self):
+        with self._lock:
+            self._size = 0
+            self._exact.clear()
+            self._entries = [None] * self.max_entries
+
+    def stats(self):
+        return {
+            'entries': self._size + len(self._exact),
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'hit_rate': round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'seconds_saved': round(self.seconds_saved, 3),
+        }
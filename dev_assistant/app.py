@@ -1,62 +1,92 @@
-import os
+import asyncio
+import time
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
-from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
 
+# Before components: the modules it imports read their settings at import
 load_dotenv()
 
-# Initialize components
-embeddings = GoogleGenerativeAIEmbeddings(
-    model="models/embedding-001",
-    google_api_key=os.getenv("GOOGLE_API_KEY")
-)
-
-parser = StrOutputParser()
-
-vector_store = PineconeVectorStore(
-    index_name="creditchek-dev-assistant",
-    embedding=embeddings,
-    pinecone_api_key=os.getenv("PINECONE_API_KEY")
-)
-
-retriever = vector_store.as_retriever()
-
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    temperature=0.3,
-    google_api_key=os.getenv("GOOGLE_API_KEY")
-)
-
-# Enhanced prompt template with memory
-prompt = PromptTemplate.from_template("""You're a  GenAI developer assistant bot  for CreditChek APIs , called "Mark Musk".
-     Also ensure to always introduce yourself when asked first asked a question. Always respond politely and professionally.\
-    Generate code that strictly follows CreditChek documentation and best practices.
-    
-    Current API version: 2.3
-    Authentication: Bearer token
-    Base URL: https://api.creditchek.africa/v2
-    
-    Follow these rules:
-    1. Always use secure practices (env variables for secrets)
-    2. Include error handling
-    3. Add relevant comments
-    4. Maintain conversation context
-      Context: {context} Question: {question}""")
-prompt.format(context="Here is some context", question="Here is a question")
-
-# Create conversational chain
-chain = (
-    {"context": retriever, "question": RunnablePassthrough()}
-    | prompt
-    | llm
-    | parser)
+from components import NAMES, Components
+
+# Clients are built on first use; see configure() and warm_up()
+components = Components()
+
+def configure(**options):
+    """Replace the components, e.g. configure(llm=fake_llm) or configure(store_backend="local")"""
+    global components
+    components = Components(**options)
+    return components
+
+def warm_up(probe=None):
+    """Build every client now instead of on the first question"""
+    return components.warm_up(probe)
+
+def __getattr__(name):
+    # app.chain, app.retriever, ... still work, built on first access
+    if name in NAMES:
+        return getattr(components, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def from_endpoint_index(context):
+    """True when the endpoint index answered retrieval on its own
+
+    The answer cache then keys on the exact question instead of embedding
+    it, so such a question makes no embedding call at all.
+    """
+    return bool(context) and all(doc.metadata.get("match") == "endpoint_index" for doc in context)
 
 def chat_interface(question):
-    result =chain.invoke(question)
+    built = components
+    # Retrieve once: the cache needs the context, and so does the answer
+    context = built.retriever.invoke(question)
+    exact = from_endpoint_index(context)
+    result = built.answer_cache.lookup(question, context, exact)
+    if result is not None:
+        return result
+    started = time.perf_counter()
+    result = built.answer_chain.invoke({"context": context, "question": question})
+    built.answer_cache.store(question, context, result, time.perf_counter() - started, exact)
     return result
+
+def chat_stream(question):
+    """Yield the answer in pieces as the model generates it"""
+    built = components
+    context = built.retriever.invoke(question)
+    exact = from_endpoint_index(context)
+    cached = built.answer_cache.lookup(question, context, exact)
+    if cached is not None:
+        yield cached
+        return
+    started = time.perf_counter()
+    parts = []
+    for chunk in built.answer_chain.stream({"context": context, "question": question}):
+        parts.append(chunk)
+        yield chunk
+    built.answer_cache.store(question, context, "".join(parts), time.perf_counter() - started, exact)
+
+async def achat_stream(question):
+    """Async chat_stream; retrieval and cache lookups run off the event loop
+
+    Call warm_up() first in a server: building the clients on the first
+    question would otherwise happen on the event loop.
+    """
+    built = components
+    context = await built.retriever.ainvoke(question)
+    exact = from_endpoint_index(context)
+    cached = await asyncio.to_thread(built.answer_cache.lookup, question, context, exact)
+    if cached is not None:
+        yield cached
+        return
+    started = time.perf_counter()
+    parts = []
+    async for chunk in built.answer_chain.astream({"context": context, "question": question}):
+        parts.append(chunk)
+        yield chunk
+    await asyncio.to_thread(built.answer_cache.store, question, context, "".join(parts),
+                            time.perf_counter() - started, exact)
+
+async def achat(question):
+    """Async chat_interface, for serving many conversations on one event loop"""
+    return "".join([chunk async for chunk in achat_stream(question)])
 # Example conversation
 if __name__ == "__main__":
     print(chat_interface("How to authenticate with the CreditChek API in GoLang?"))
\ No newline at end of file
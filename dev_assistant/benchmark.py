@@ -0,0 +1,333 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from local_store import LocalVectorStore
+
+
+class LookupEmbeddings(Embeddings):
+    """Embeds the text "<n>" as the n-th row of a precomputed matrix"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_documents(self, texts):
+        return self.vectors[[int(text) for text in texts]]
+
+    def embed_query(self, text):
+        return self.vectors[int(text)]
+
+
+def clustered_vectors(count, dim, topics, seed=0):
+    """Unit vectors grouped around topics, roughly like documentation chunks"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, dim)).astype(np.float32)
+    vectors = centers[rng.integers(topics, size=count)] + 0.6 * rng.standard_normal(
+        (count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _latencies(fn, queries):
+    seconds = []
+    results = []
+    for query in queries:
+        started = time.perf_counter()
+        results.append(fn(query))
+        seconds.append(time.perf_counter() - started)
+    ms = np.array(seconds) * 1000
+    return results, {'p50_ms': round(float(np.percentile(ms, 50)), 3),
+                     'p99_ms': round(float(np.percentile(ms, 99)), 3)}
+
+
+def bench_store(count, dim=768, queries=200, k=10, nprobe=8, seed=0):
+    """Exact and approximate query latency, and recall@k of the approximate index"""
+    vectors = clustered_vectors(count, dim, topics=max(8, count // 250), seed=seed)
+    rng = np.random.default_rng(seed + 1)
+    probes = vectors[rng.choice(count, queries, replace=False)]
+    probes = probes + 0.3 * rng.standard_normal(probes.shape).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(LookupEmbeddings(vectors), tmp, nprobe=nprobe)
+        started = time.perf_counter()
+        for start in range(0, count, 1000):
+            stop = min(count, start + 1000)
+            store.add_texts([str(i) for i in range(start, stop)],
+                            ids=[str(i) for i in range(start, stop)])
+        insert_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        store.build_index()
+        index_seconds = time.perf_counter() - started
+
+        exact, exact_latency = _latencies(lambda q: store.search_vector(q, k, approximate=False), probes)
+        approx, approx_latency = _latencies(lambda q: store.search_vector(q, k, approximate=True), probes)
+        recall = np.mean([len({r for r, _ in a} & {r for r, _ in e}) / k
+                          for a, e in zip(approx, exact)])
+
+        reopened = time.perf_counter()
+        LocalVectorStore(LookupEmbeddings(vectors), tmp)
+        open_seconds = time.perf_counter() - reopened
+
+    return {
+        'vectors': count, 'dim': dim, 'k': k, 'nprobe': nprobe,
+        'lists': len(store.centroids),
+        'insert_per_second': round(count / insert_seconds, 1),
+        'index_seconds': round(index_seconds, 3),
+        'open_seconds': round(open_seconds, 3),
+        'exact': exact_latency,
+        'approximate': approx_latency,
+        'recall': round(float(recall), 4),
+    }
+
+
+ANSWER = ("To authenticate, send your secret key as a Bearer token in the Authorization "
+          "header of every request to https://api.creditchek.africa/v2. Keep the key in an "
+          "environment variable and never commit it.")
+
+
+def fake_assistant(directory, token_delay=0.005):
+    """Point app at offline parts: fake embeddings, a local store and a fake chat model
+
+    The model produces ANSWER at one character every token_delay seconds,
+    streamed or not.
+    """
+    from langchain_core.language_models import FakeListChatModel
+
+    class FakeChatModel(FakeListChatModel):
+        def _call(self, *args, **kwargs):
+            response = super()._call(*args, **kwargs)
+            time.sleep(self.sleep * len(response))
+            return response
+
+    import app
+    from answer_cache import AnswerCache
+    from embeddings import build_embeddings
+
+    embeddings = build_embeddings("fake", cache_dir=None)
+    store = LocalVectorStore(embeddings, directory)
+    store.add_texts([f"CreditChek documentation section {i}" for i in range(200)])
+    app.configure(embeddings=embeddings, vector_store=store,
+                  llm=FakeChatModel(responses=[ANSWER], sleep=token_delay),
+                  answer_cache=AnswerCache(embeddings, max_entries=0))
+    return app
+
+
+def bench_chat(conversations=20, token_delay=0.005):
+    """Time to first token and total time, blocking call vs stream vs async"""
+    with tempfile.TemporaryDirectory() as tmp:
+        app = fake_assistant(tmp, token_delay)
+
+        started = time.perf_counter()
+        app.chat_interface("question 0")
+        blocking = time.perf_counter() - started
+
+        started = time.perf_counter()
+        stream = app.chat_stream("question 1")
+        next(stream)
+        stream_first = time.perf_counter() - started
+        for _ in stream:
+            pass
+
+        async def conversation(i):
+            started = time.perf_counter()
+            first = None
+            async for _ in app.achat_stream(f"question {i + 2}"):
+                if first is None:
+                    first = time.perf_counter() - started
+            return first, time.perf_counter() - started
+
+        async def run_all():
+            return await asyncio.gather(*(conversation(i) for i in range(conversations)))
+
+        started = time.perf_counter()
+        timings = np.array(asyncio.run(run_all())) * 1000
+        wall = time.perf_counter() - started
+
+    return {
+        'answer_chars': len(ANSWER), 'token_delay': token_delay,
+        'blocking_ms': round(blocking * 1000, 1),
+        'stream_first_token_ms': round(stream_first * 1000, 1),
+        'async': {
+            'conversations': conversations,
+            'first_token_p50_ms': round(float(np.percentile(timings[:, 0], 50)), 1),
+            'first_token_p99_ms': round(float(np.percentile(timings[:, 0], 99)), 1),
+            'total_p50_ms': round(float(np.percentile(timings[:, 1], 50)), 1),
+            'wall_ms': round(wall * 1000, 1),
+        },
+    }
+
+
+def bench_startup(repeat=5):
+    """Cold import time of app in fresh interpreters, and warm_up() on offline parts"""
+    code = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+    here = os.path.dirname(os.path.abspath(__file__))
+    imports = [float(subprocess.run([sys.executable, '-c', code], cwd=here, check=True,
+                                    capture_output=True, text=True).stdout)
+               for _ in range(repeat)]
+    with tempfile.TemporaryDirectory() as tmp:
+        app = fake_assistant(tmp)
+        started = time.perf_counter()
+        built = app.warm_up()
+        warm_up = time.perf_counter() - started
+    return {
+        'import_ms': {'min': round(min(imports) * 1000, 1),
+                      'median': round(float(np.median(imports)) * 1000, 1)},
+        'warm_up_ms': round(warm_up * 1000, 1),
+        'build_seconds': built,
+    }
+
+
+def bench_endpoints(endpoints=500, queries=2000):
+    """Endpoint index lookup latency, against exact vector search over as many chunks"""
+    from langchain_core.documents import Document
+
+    from endpoint_index import EndpointIndex
+
+    rng = np.random.default_rng(0)
+    groups = ['identity', 'income', 'credit', 'recova', 'customers', 'transactions']
+    paths = [f"/{groups[i % len(groups)]}/resource{i}/{{id}}" for i in range(endpoints)]
+    chunks = [(str(i), Document(page_content=f"POST {path}\nbody: customer_id{i}",
+                                metadata={"source": f"https://docs.example/{i}"}))
+              for i, path in enumerate(paths)]
+    api_info = {doc.metadata["source"]: {"endpoints": [paths[int(id_)]], "methods": ["POST"],
+                                         "parameters": [{"name": f"customer_id{id_}"}]}
+                for id_, doc in chunks}
+    index = EndpointIndex.build(chunks, api_info)
+    asked = [f"How do I call POST {paths[i]} from Go?" for i in rng.integers(endpoints, size=queries)]
+    found, lookup_latency = _latencies(lambda q: index.lookup(q)[0], asked)
+
+    vectors = clustered_vectors(endpoints * 10, 768, topics=64)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(LookupEmbeddings(vectors), tmp)
+        store.add_texts([str(i) for i in range(len(vectors))])
+        _, vector_latency = _latencies(lambda q: store.search_vector(q, 4), vectors[:200])
+
+    return {
+        'endpoints': endpoints, 'queries': queries,
+        'hit_rate': round(sum(bool(ids) for ids in found) / queries, 4),
+        'lookup_us': {'p50': round(lookup_latency['p50_ms'] * 1000, 1),
+                      'p99': round(lookup_latency['p99_ms'] * 1000, 1)},
+        'vector_search_chunks': len(vectors),
+        'vector_search': vector_latency,
+    }
+
+
+def docs_server(pages, latency):
+    """Serve pages linked as a binary tree on 127.0.0.1, each reply after latency seconds
+
+    Page i links to pages 2i+1 and 2i+2 and documents one endpoint, so a
+    crawl from page 0 reaches every page. Returns the running server;
+    its URL is http://127.0.0.1:<server.server_port>/docs/0.
+    """
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            i = int(self.path.rsplit('/', 1)[-1])
+            links = ''.join(f'<a href="/docs/{j}">page {j}</a>' for j in (2 * i + 1, 2 * i + 2) if j < pages)
+            body = (f'<html><body><h1>Page {i}</h1><pre>POST /resource{i}\n{{"customer_id": "{i}"}}</pre>'
+                    f'{links}</body></html>').encode()
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench_crawl(pages=200, latency=0.02, workers=(1, 4, 8, 16)):
+    """Crawler pages/s against a local server answering after latency seconds"""
+    from crawler import Crawler
+
+    server = docs_server(pages, latency)
+    url = f"http://127.0.0.1:{server.server_port}/docs/0"
+    runs = []
+    try:
+        for count in workers:
+            crawler = Crawler(url, workers=count, rate=None)
+            crawled = sum(1 for _ in crawler.crawl())
+            runs.append({'workers': count, 'pages': crawled, 'failed': len(crawler.failed),
+                         'seconds': round(crawler.seconds, 3),
+                         'pages_per_second': round(crawled / crawler.seconds, 1)})
+    finally:
+        server.shutdown()
+        server.server_close()
+    return {'pages': pages, 'latency_ms': latency * 1000, 'runs': runs}
+
+
+SUITES = {
+    'quick': [dict(count=10_000)],
+    'full': [dict(count=c) for c in (10_000, 50_000, 200_000)]
+    + [dict(count=50_000, nprobe=p) for p in (4, 16)],
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the local vector store, chat latency, startup, the endpoint index and the crawler")
+    parser.add_argument('--suite', choices=sorted(SUITES) + ['chat', 'startup', 'endpoints', 'crawl'],
+                        default='quick')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--conversations', type=int, default=20, help="concurrent chats (chat suite)")
+    parser.add_argument('--pages', type=int, default=200, help="pages served (crawl suite)")
+    parser.add_argument('--latency', type=float, default=0.02, help="seconds per response (crawl suite)")
+    parser.add_argument('-o', '--output', default='store_benchmark.json')
+    args = parser.parse_args(argv)
+
+    results = []
+    if args.suite == 'chat':
+        result = bench_chat(args.conversations)
+        results.append(result)
+        print(f"blocking {result['blocking_ms']:.0f} ms, first token {result['stream_first_token_ms']:.0f} ms, "
+              f"{args.conversations} async chats in {result['async']['wall_ms']:.0f} ms", file=sys.stderr)
+    if args.suite == 'startup':
+        result = bench_startup()
+        results.append(result)
+        print(f"import app {result['import_ms']['median']:.1f} ms, "
+              f"warm_up {result['warm_up_ms']:.1f} ms", file=sys.stderr)
+    if args.suite == 'endpoints':
+        result = bench_endpoints()
+        results.append(result)
+        print(f"endpoint lookup p50 {result['lookup_us']['p50']:.1f} us (hit rate {result['hit_rate']:.3f}), "
+              f"vector search p50 {result['vector_search']['p50_ms']:.2f} ms", file=sys.stderr)
+    if args.suite == 'crawl':
+        result = bench_crawl(args.pages, args.latency)
+        results.append(result)
+        for run in result['runs']:
+            print(f"{run['workers']:>3} workers: {run['pages']} pages in {run['seconds']:.2f} s, "
+                  f"{run['pages_per_second']:.1f} pages/s", file=sys.stderr)
+    for case in SUITES.get(args.suite, ()):
+        result = bench_store(queries=args.queries, **case)
+        results.append(result)
+        print(f"{result['vectors']:>7} vectors nprobe={result['nprobe']:<3} "
+              f"exact p50 {result['exact']['p50_ms']:.2f} ms, "
+              f"approx p50 {result['approximate']['p50_ms']:.2f} ms, "
+              f"recall@{result['k']} {result['recall']:.3f}", file=sys.stderr)
+
+    with open(args.output, 'w') as f:
+        json.dump({'python': platform.python_version(), 'platform': platform.platform(),
+                   'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
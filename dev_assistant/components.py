@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+
+CHAT_MODEL = "gemini-2.0-flash"
+
+# Enhanced prompt template with memory
+PROMPT_TEMPLATE = """You're a  GenAI developer assistant bot  for CreditChek APIs , called "Mark Musk".
+     Also ensure to always introduce yourself when asked first asked a question. Always respond politely and professionally.\
+    Generate code that strictly follows CreditChek documentation and best practices.
+    
+    Current API version: 2.3
+    Authentication: Bearer token
+    Base URL: https://api.creditchek.africa/v2
+    
+    Follow these rules:
+    1. Always use secure practices (env variables for secrets)
+    2. Include error handling
+    3. Add relevant comments
+    4. Maintain conversation context
+      Context: {context} Question: {question}"""
+
+NAMES = ('embeddings', 'vector_store', 'retriever', 'llm', 'prompt', 'parser',
+         'answer_chain', 'chain', 'answer_cache')
+
+
+class Components:
+    """The assistant's clients and chain, each built on first use
+
+    Nothing is imported or constructed until an attribute is read, so
+    importing the app costs almost nothing and needs no credentials.
+    Options left as None fall back to the environment (EMBEDDING_MODEL,
+    VECTOR_STORE, ...); any component can be passed in ready-made instead,
+    e.g. Components(llm=fake_llm) in tests. warm_up() builds everything
+    up front for servers that would rather pay before the first request.
+    """
+
+    def __init__(self, embedding_model=None, store_backend=None, chat_model=CHAT_MODEL,
+                 temperature=0.3, **prebuilt):
+        unknown = set(prebuilt) - set(NAMES)
+        if unknown:
+            raise TypeError(f"Unknown components: {', '.join(sorted(unknown))}")
+        self.embedding_model = embedding_model
+        self.store_backend = store_backend
+        self.chat_model = chat_model
+        self.temperature = temperature
+        self.build_seconds = {}
+        self._built = dict(prebuilt)
+        self._lock = threading.RLock()
+
+    def _get(self, name):
+        try:
+            return self._built[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._built:
+                started = time.perf_counter()
+                self._built[name] = getattr(self, f'_build_{name}')()
+                self.build_seconds[name] = round(time.perf_counter() - started, 4)
+            return self._built[name]
+
+    def _build_embeddings(self):
+        from embeddings import build_embeddings
+
+        return build_embeddings(self.embedding_model) if self.embedding_model else build_embeddings()
+
+    def _build_vector_store(self):
+        from local_store import open_vector_store
+
+        # Pinecone, or the on-disk store when VECTOR_STORE=local
+        if self.store_backend:
+            return open_vector_store(self.embeddings, self.store_backend)
+        return open_vector_store(self.embeddings)
+
+    def _build_retriever(self):
+        from endpoint_index import EndpointFirstRetriever, EndpointIndexFile
+
+        # Questions naming an endpoint go to the exact index written by
+        # ingestion, re-read whenever a later run rewrites or creates it
+        return EndpointFirstRetriever(index_file=EndpointIndexFile(),
+                                      vector_retriever=self.vector_store.as_retriever())
+
+    def _build_llm(self):
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        return ChatGoogleGenerativeAI(model=self.chat_model, temperature=self.temperature,
+                                      google_api_key=os.getenv("GOOGLE_API_KEY"))
+
+    def _build_prompt(self):
+        from langchain_core.prompts import PromptTemplate
+
+        return PromptTemplate.from_template(PROMPT_TEMPLATE)
+
+    def _build_parser(self):
+        from langchain_core.output_parsers import StrOutputParser
+
+        return StrOutputParser()
+
+    def _build_answer_chain(self):
+        return self.prompt | self.llm | self.parser
+
+    def _build_chain(self):
+        from langchain_core.runnables import RunnablePassthrough
+
+        return {"context": self.retriever, "question": RunnablePassthrough()} | self.answer_chain
+
+    def _build_answer_cache(self):
+        from answer_cache import AnswerCache
+
+        # Answers reused for near-identical questions over unchanged context
+        return AnswerCache(self.embeddings)
+
+    def warm_up(self, probe=None):
+        """Build every component now; returns build seconds per component
+
+        With a probe question, also run one retrieval so connection pools
+        and the query embedding cache are warm too.
+        """
+        for name in NAMES:
+            self._get(name)
+        if probe:
+            started = time.perf_counter()
+            self.retriever.invoke(probe)
+            self.build_seconds['probe'] = round(time.perf_counter() - started, 4)
+        return dict(self.build_seconds)
+
+
+for _name in NAMES:
+    setattr(Components, _name, property(lambda self, name=_name: self._get(name)))
@@ -0,0 +1,171 @@
+import collections
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urldefrag, urljoin, urlparse
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+
+class HostLimiter:
+    """Spaces requests to each host at least 1 / rate seconds apart"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Crawler:
+    """Breadth-first crawl of one site with a pool of worker threads
+
+    Each host gets one requests.Session whose connection pool is sized to
+    the worker count, so connections are kept alive and reused. URLs are
+    deduplicated when they are discovered rather than when they are
+    visited, so the frontier never holds the same page twice.
+    """
+
+    def __init__(self, start_url, workers=8, rate=10.0, timeout=10, max_pages=None):
+        self.start_url = urldefrag(start_url)[0]
+        self.domain = urlparse(self.start_url).netloc
+        self.workers = workers
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.limiter = HostLimiter(rate)
+        self.frontier = collections.deque([self.start_url])
+        self.seen = {self.start_url}
+        self.failed = set()
+        self.api_info = {}
+        self.seconds = 0.0
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def session(self, host):
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                session.headers.update(HEADERS)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[host] = session
+            return session
+
+    def get(self, url):
+        host = urlparse(url).netloc
+        self.limiter.wait(host)
+        return self.session(host).get(url, timeout=self.timeout)
+
+    def fetch(self, url):
+        """Worker: return (document text or None, links found on the page, api_info or None)"""
+        if url.lower().endswith('.pdf'):
+            return extract_pdf_text(self.get(url).content), [], None
+
+        response = self.get(url)
+        if 'text/html' not in response.headers.get('Content-Type', ''):
+            return None, [], None
+        soup = BeautifulSoup(response.text, 'html.parser')
+        links = [urldefrag(urljoin(url, link['href']))[0] for link in soup.find_all('a', href=True)]
+        return soup.get_text(separator='\n', strip=True), links, extract_api_info(soup)
+
+    def enqueue(self, links):
+        for link in links:
+            if urlparse(link).netloc == self.domain and link not in self.seen:
+                self.seen.add(link)
+                self.frontier.append(link)
+
+    def crawl(self):
+        """Yield (url, text) for every page reached from start_url
+
+        Endpoints and parameters found on the way are kept in api_info by URL.
+        """
+        started = time.perf_counter()
+        pending = {}
+        fetched = 0
+        with ThreadPoolExecutor(self.workers) as pool:
+            while self.frontier or pending:
+                while (self.frontier and len(pending) < self.workers
+                       and (self.max_pages is None or fetched + len(pending) < self.max_pages)):
+                    url = self.frontier.popleft()
+                    pending[pool.submit(self.fetch, url)] = url
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = pending.pop(future)
+                    fetched += 1
+                    try:
+                        text, links, api_info = future.result()
+                    except Exception as e:
+                        self.failed.add(url)
+                        print(f"Error processing {url}: {e}")
+                        continue
+                    self.enqueue(links)
+                    if api_info and (api_info["endpoints"] or api_info["parameters"]):
+                        self.api_info[url] = api_info
+                    if text:
+                        yield url, text
+        self.seconds = time.perf_counter() - started
+        for session in self._sessions.values():
+            session.close()
+
+
+def extract_pdf_text(content):
+    import PyPDF2
+    from io import BytesIO
+
+    reader = PyPDF2.PdfReader(BytesIO(content))
+    return "\n".join(page.extract_text() for page in reader.pages)
+
+
+def extract_api_info(content):
+    """Endpoints, methods and parameters documented in a page, as DocumentScraper finds them
+
+    METHOD /path lines and "name": value pairs in <pre> blocks, and the
+    rows of parameter tables with every column kept by header. This is
+    the one implementation; DocumentScraper._extract_api_info in test.py
+    calls it for its metadata["api_info"].
+    """
+    api_info = {"endpoints": [], "methods": [], "parameters": []}
+    for block in content.find_all('pre'):
+        code = block.get_text()
+        for method, endpoint in re.findall(r'(GET|POST|PUT|DELETE|PATCH)\s+(/\S+)', code):
+            api_info["endpoints"].append(endpoint)
+            api_info["methods"].append(method)
+        for name, text_value, number_value in re.findall(
+                r'["\']([\w_]+)["\']:\s*(?:["\'](.*?)["\']|(\d+))', code):
+            api_info["parameters"].append({"name": name, "example": text_value or number_value})
+
+    for table in content.find_all('table'):
+        rows = table.find_all('tr')
+        headers = [cell.get_text().strip().lower() for cell in rows[0].find_all(['th', 'td'])] if rows else []
+        if 'parameter' in headers or 'name' in headers:
+            column = headers.index('parameter') if 'parameter' in headers else headers.index('name')
+            for row in rows[1:]:
+                cells = row.find_all(['td', 'th'])
+                if len(cells) > column:
+                    param = {"name": cells[column].get_text().strip()}
+                    # Description, type, required, ... under their own headers
+                    param.update((header, cells[i].get_text().strip()) for i, header in enumerate(headers)
+                                 if i < len(cells) and i != column)
+                    api_info["parameters"].append(param)
+    return api_info
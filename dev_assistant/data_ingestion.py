@@ -1,24 +1,41 @@
 # Description: This script is used to scrape the documentation site of CreditChek Africa and ingest the data into the Pinecone vector store.
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_pinecone import PineconeVectorStore
 from langchain.docstore.document import Document
+import hashlib
+import json
 import os
 from dotenv import load_dotenv
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+# Load environment variables before the modules below read their settings
+load_dotenv()
+
 from langchain_core.documents import Document
-import PyPDF2
-from io import BytesIO
-from bs4 import BeautifulSoup
 import requests
-from urllib.parse import urljoin, urlparse
+from crawler import Crawler, extract_pdf_text
+from answer_cache import bump_index_generation
+from embeddings import EMBEDDING_MODEL, build_embeddings
+from endpoint_index import ENDPOINT_INDEX_PATH, EndpointIndex
+from local_store import INDEX_NAME, LOCAL_STORE_DIR, VECTOR_STORE, open_vector_store
 
-# Load environment variables
-load_dotenv()
 API_KEY = os.getenv("GOOGLE_API_KEY")
-os.environ["PINECONE_API_KEY"] = os.getenv("PINECONE_API_KEY")
-# Initialize components
-embeddings = GoogleGenerativeAIEmbeddings(
-    model="models/embedding-001", google_api_key=API_KEY)
+# Concurrent fetches, and requests per second allowed to each host
+CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", "8"))
+CRAWL_RATE = float(os.getenv("CRAWL_RATE", "10"))
+# Where the chunks go; switching backend means a full re-ingest
+STORE_NAME = INDEX_NAME if VECTOR_STORE == "pinecone" else f"local:{LOCAL_STORE_DIR}"
+# What is already in the index, so re-runs only embed what changed
+MANIFEST_PATH = os.getenv("INGEST_MANIFEST", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ingest_manifest.json"))
+UPSERT_BATCH = 100
+DELETE_BATCH = 1000  # Pinecone's limit on IDs per delete
+_embeddings = None
+
+
+def get_embeddings():
+    """The ingestion embeddings, built on first use rather than at import"""
+    global _embeddings
+    if _embeddings is None:
+        _embeddings = build_embeddings()
+    return _embeddings
 
 
 # scraper function
@@ -26,80 +43,132 @@ def extract_text_from_pdf(url):
     """Extract text from PDF files"""
     try:
         response = requests.get(url)
-        pdf_file = BytesIO(response.content)
-        reader = PyPDF2.PdfReader(pdf_file)
-        return "\n".join([page.extract_text() for page in reader.pages])
+        return extract_pdf_text(response.content)
     except Exception as e:
         print(f"Error processing PDF {url}: {e}")
         return ""
 
-def fetch_all_pages(start_url):
-    """Recursively crawl all pages under the same domain"""
-    parsed_start = urlparse(start_url)
-    visited = set()
-    queue = [start_url]
-    pages_content = []
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
-
-    while queue:
-        url = queue.pop(0)
-        if url in visited:
-            continue
-        visited.add(url)
-
-        try:
-            # Handle PDF files
-            if url.lower().endswith('.pdf'):
-                text = extract_text_from_pdf(url)
-                if text:
-                    pages_content.append(Document(page_content=text, metadata={"source": url}))
-                continue
-
-            # Handle HTML pages
-            response = requests.get(url, headers=headers, timeout=10)
-            content_type = response.headers.get('Content-Type', '')
-
-            if 'text/html' not in content_type:
-                continue
-
-            soup = BeautifulSoup(response.text, 'html.parser')
-            page_text = soup.get_text(separator='\n', strip=True)
-            pages_content.append(Document(page_content=page_text, metadata={"source": url}))
-
-            # Extract and queue links
-            for link in soup.find_all('a', href=True):
-                href = link['href'].split('#')[0]  # Remove anchors
-                absolute_url = urljoin(url, href)
-                parsed = urlparse(absolute_url)
-
-                # Normalize URL and check domain
-                if parsed.netloc == parsed_start.netloc:
-                    normalized = parsed.geturl()
-                    if normalized not in visited:
-                        queue.append(normalized)
-
-        except Exception as e:
-            print(f"Error processing {url}: {e}")
-
-    return pages_content
+def crawl_site(start_url, workers=CRAWL_WORKERS, rate=CRAWL_RATE):
+    """Crawl all pages under the same domain; returns (documents, failed URLs, api_info by URL)"""
+    crawler = Crawler(start_url, workers=workers, rate=rate)
+    pages_content = [Document(page_content=text, metadata={"source": url})
+                     for url, text in crawler.crawl()]
+    print(f"Crawled {len(pages_content)} pages in {crawler.seconds:.1f}s "
+          f"({len(pages_content) / max(crawler.seconds, 1e-9):.1f} pages/s, "
+          f"{len(crawler.failed)} errors)")
+    return pages_content, crawler.failed, crawler.api_info
+
+
+def fetch_all_pages(start_url, workers=CRAWL_WORKERS, rate=CRAWL_RATE):
+    """Crawl all pages under the same domain with a pool of workers"""
+    return crawl_site(start_url, workers, rate)[0]
+
+
+def chunk_id(source, text):
+    """Stable ID for a chunk: the same text from the same page keeps its ID"""
+    content = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    return hashlib.sha256(f"{source}\n{content}".encode('utf-8')).hexdigest()[:32]
+
+
+def load_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"model": EMBEDDING_MODEL, "index": STORE_NAME, "chunks": {}}
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    # Write then rename, so an interrupted run never leaves half a manifest
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def plan_ingestion(split_docs, manifest, failed=()):
+    """Work out which chunks to embed and which stored ones to delete
+
+    Returns (new_ids, new_docs, removed_ids, skipped). Stale chunks of
+    pages fetched this run are removed. Chunks of pages not reached at all
+    are only removed when nothing failed: a failed page hides the pages
+    linked from it, so after a root failure nothing would be reached.
+    """
+    current = {}
+    for doc in split_docs:
+        current.setdefault(chunk_id(doc.metadata["source"], doc.page_content), doc)
+
+    fetched = {doc.metadata["source"] for doc in split_docs}
+    known = manifest["chunks"]
+    new_ids = [id_ for id_ in current if id_ not in known]
+    removed_ids = [id_ for id_, source in known.items()
+                   if id_ not in current and (source in fetched or not failed)]
+    skipped = len(current) - len(new_ids)
+    return new_ids, [current[id_] for id_ in new_ids], removed_ids, skipped
 
 # load the data and ingest to the database
-def enhanced_ingestion():
+def enhanced_ingestion(full=False):
+    """Embed and upsert only new or changed chunks, and delete removed ones
+
+    full=True clears the index and the manifest first; that is also what
+    happens when the embedding model or vector store recorded in the manifest
+    no longer matches.
+    """
     # Scrape all content from the documentation site
-    pages_content = fetch_all_pages("https://docs.creditchek.africa")
+    pages_content, failed, api_info = crawl_site("https://docs.creditchek.africa")
     # Chunking
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=2000,
         chunk_overlap=200)
     split_docs = text_splitter.split_documents(pages_content)
-    
-    # Create vector store
-    PineconeVectorStore.from_documents(
-        split_docs,
-        embeddings,
-        index_name="creditchek-dev-assistant")
+
+    vector_store = open_vector_store(get_embeddings())
+    if not full and not os.path.exists(MANIFEST_PATH):
+        print(f"No manifest at {MANIFEST_PATH}; if the index was filled by an older "
+              f"ingestion, run once with --full to drop its untracked chunks")
+    manifest = load_manifest()
+    reset = False
+    if full or manifest["model"] != EMBEDDING_MODEL or manifest["index"] != STORE_NAME:
+        if manifest["chunks"] or full:
+            vector_store.delete(delete_all=True)
+            reset = True
+        manifest = {"model": EMBEDDING_MODEL, "index": STORE_NAME, "chunks": {}}
+
+    new_ids, new_docs, removed_ids, skipped = plan_ingestion(split_docs, manifest, failed)
+    for start in range(0, len(removed_ids), DELETE_BATCH):
+        batch = removed_ids[start:start + DELETE_BATCH]
+        vector_store.delete(ids=batch)
+        for id_ in batch:
+            del manifest["chunks"][id_]
+        save_manifest(manifest)
+    for start in range(0, len(new_docs), UPSERT_BATCH):
+        docs = new_docs[start:start + UPSERT_BATCH]
+        ids = new_ids[start:start + UPSERT_BATCH]
+        vector_store.add_documents(docs, ids=ids)
+        manifest["chunks"].update((id_, doc.metadata["source"]) for id_, doc in zip(ids, docs))
+        save_manifest(manifest)
+    save_manifest(manifest)
+    # Rebuilt every run: it needs no embeddings, only the chunks and api_info.
+    # A crawl with errors may have missed whole sections, so it keeps the old one
+    endpoints = EndpointIndex.build(
+        [(chunk_id(doc.metadata["source"], doc.page_content), doc) for doc in split_docs], api_info)
+    if failed and os.path.exists(ENDPOINT_INDEX_PATH):
+        print(f"{len(failed)} pages failed; keeping the endpoint index at {ENDPOINT_INDEX_PATH}")
+        endpoints = EndpointIndex.load(ENDPOINT_INDEX_PATH)
+    else:
+        endpoints.save(ENDPOINT_INDEX_PATH)
+    if new_docs or removed_ids or reset:
+        # Cached answers may quote chunks that just changed
+        bump_index_generation()
+
+    print(f"Embedded {len(new_docs)} new or changed chunks, deleted {len(removed_ids)}, "
+          f"skipped {skipped} unchanged; {len(endpoints)} endpoints indexed")
+    return {"added": len(new_docs), "deleted": len(removed_ids), "skipped": skipped,
+            "endpoints": len(endpoints)}
 
 if __name__ == "__main__":
-    enhanced_ingestion()
\ No newline at end of file
+    import argparse
+
+    cli = argparse.ArgumentParser(description="Ingest the CreditChek docs into the vector store")
+    cli.add_argument("--full", action="store_true", help="clear the index and re-embed everything")
+    enhanced_ingestion(full=cli.parse_args().full)
\ No newline at end of file
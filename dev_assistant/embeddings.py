@@ -0,0 +1,205 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "models/embedding-001")
+EMBEDDING_DIMENSION = 768
+EMBEDDING_CACHE_DIR = os.getenv(
+    "EMBEDDING_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".embedding_cache"))
+
+
+class VectorCache:
+    """On-disk float32 vectors keyed by text hash, least recently used evicted
+
+    Vectors sit in one memory-mapped matrix that grows by doubling up to
+    max_entries rows; a SQLite table maps each key to its row and tracks
+    last use, and an evicted key's row is reused by the next insert.
+    Several processes may share the directory (the app and ingestion do):
+    SQLite is the source of truth, and the matrix is remapped whenever it
+    names a row beyond the current mapping.
+    """
+
+    def __init__(self, directory, max_entries=200_000):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.Lock()
+        self._clock = 0
+        self.db = sqlite3.connect(self.directory / 'index.sqlite3', isolation_level=None,
+                                  check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS vectors (
+            key TEXT PRIMARY KEY, row INTEGER NOT NULL, last_access INTEGER NOT NULL)''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS vectors_lru ON vectors (last_access)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)')
+        self._clock = self.db.execute('SELECT COALESCE(MAX(last_access), 0) FROM vectors').fetchone()[0]
+        self.dim = None
+        self.matrix = None
+        self._remap()
+
+    @property
+    def _path(self):
+        return self.directory / 'vectors.f32'
+
+    def _open(self, rows=None):
+        size = self._path.stat().st_size if self._path.exists() else 0
+        if rows is not None and rows * self.dim * 4 > size:
+            with open(self._path, 'ab') as f:
+                f.truncate(rows * self.dim * 4)
+            size = rows * self.dim * 4
+        rows = size // (self.dim * 4)
+        self.matrix = np.memmap(self._path, np.float32, 'r+', shape=(rows, self.dim)) if rows else None
+
+    def _remap(self):
+        """Pick up the dimension and file size another process may have written"""
+        if self.dim is None:
+            dim = self.db.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+            self.dim = dim[0] if dim else None
+        if self.dim:
+            self.matrix = None
+            self._open()
+
+    def get_many(self, keys):
+        """Return {key: vector} for the keys that are cached"""
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                marks = ','.join('?' * len(batch))
+                found.update(self.db.execute(
+                    f'SELECT key, row FROM vectors WHERE key IN ({marks})', batch))
+            if found:
+                self._clock += 1
+                self.db.executemany('UPDATE vectors SET last_access = ? WHERE key = ?',
+                                    [(self._clock, key) for key in found])
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+            if found and (self.matrix is None or max(found.values()) >= len(self.matrix)):
+                self._remap()
+            return {key: np.array(self.matrix[row]) for key, row in found.items()}
+
+    def put_many(self, items):
+        """Store (key, vector) pairs, evicting the least recently used if full"""
+        items = list(items)
+        if not items:
+            return
+        with self._lock, self.db:
+            self.db.execute('BEGIN IMMEDIATE')
+            if self.dim is None:
+                self.db.execute("INSERT OR IGNORE INTO meta VALUES ('dim', ?)", (len(items[0][1]),))
+                self._remap()
+            count, top = self.db.execute(
+                'SELECT COUNT(*), COALESCE(MAX(row) + 1, 0) FROM vectors').fetchone()
+            items = items[-self.max_entries:]
+            fresh = [(key, vector) for key, vector in items
+                     if not self.db.execute('SELECT 1 FROM vectors WHERE key = ?', (key,)).fetchone()]
+
+            rows = list(range(top, min(self.max_entries, top + len(fresh))))
+            if len(rows) < len(fresh):
+                stale = self.db.execute('SELECT key, row FROM vectors ORDER BY last_access LIMIT ?',
+                                        (len(fresh) - len(rows),)).fetchall()
+                self.db.executemany('DELETE FROM vectors WHERE key = ?', [(key,) for key, _ in stale])
+                rows += [row for _, row in stale]
+                self.evictions += len(stale)
+
+            needed = max(rows, default=-1) + 1
+            if self.matrix is None or needed > len(self.matrix):
+                current = 0 if self.matrix is None else len(self.matrix)
+                self.matrix = None
+                self._open(min(self.max_entries, max(needed, 1024, 2 * current)))
+
+            self._clock += 1
+            for (key, vector), row in zip(fresh, rows):
+                self.matrix[row] = vector
+            self.matrix.flush()
+            self.db.executemany('INSERT INTO vectors VALUES (?, ?, ?)',
+                                [(key, row, self._clock) for (key, _), row in zip(fresh, rows)])
+
+    def stats(self):
+        entries = self.db.execute('SELECT COUNT(*) FROM vectors').fetchone()[0]
+        lookups = self.hits + self.misses
+        return {'entries': entries, 'max_entries': self.max_entries, 'hits': self.hits,
+                'misses': self.misses, 'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'bytes': self._path.stat().st_size if self._path.exists() else 0}
+
+    def close(self):
+        self.db.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an embeddings model with batching, concurrency and a VectorCache
+
+    Only texts missing from the cache reach the model, deduplicated and
+    split into batches of batch_size that run max_concurrency at a time.
+    Keys include the model name and whether the text is a query or a
+    document, since some models embed the two differently.
+    """
+
+    def __init__(self, model, model_name, cache=None, batch_size=100, max_concurrency=4):
+        self.model = model
+        self.model_name = model_name
+        self.cache = cache
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+
+    def _key(self, kind, text):
+        return hashlib.sha256(f"{self.model_name}\0{kind}\0{text}".encode('utf-8')).hexdigest()
+
+    def embed_documents(self, texts):
+        keys = [self._key('document', text) for text in texts]
+        vectors = self.cache.get_many(keys) if self.cache else {}
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        if missing:
+            pending = list(missing.items())
+            batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+            with ThreadPoolExecutor(min(self.max_concurrency, len(batches))) as pool:
+                results = pool.map(lambda batch: self.model.embed_documents([t for _, t in batch]),
+                                   batches)
+                embedded = [(key, vector) for batch, batch_vectors in zip(batches, results)
+                            for (key, _), vector in zip(batch, batch_vectors)]
+            if self.cache:
+                self.cache.put_many(embedded)
+            vectors.update((key, np.asarray(vector, np.float32)) for key, vector in embedded)
+
+        return [vectors[key].tolist() for key in keys]
+
+    def embed_query(self, text):
+        key = self._key('query', text)
+        cached = self.cache.get_many([key]) if self.cache else {}
+        if key in cached:
+            return cached[key].tolist()
+        vector = self.model.embed_query(text)
+        if self.cache:
+            self.cache.put_many([(key, np.asarray(vector, np.float32))])
+        return list(vector)
+
+    def stats(self):
+        return self.cache.stats() if self.cache else {}
+
+
+def build_embeddings(model=EMBEDDING_MODEL, cache_dir=EMBEDDING_CACHE_DIR, **options):
+    """The embeddings used for ingestion and retrieval, behind the cache
+
+    model="fake" gives a deterministic offline model of the same
+    dimension, for tests and benchmarks without a Google API key.
+    """
+    if model == "fake":
+        inner = DeterministicFakeEmbedding(size=EMBEDDING_DIMENSION)
+    else:
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        inner = GoogleGenerativeAIEmbeddings(model=model, google_api_key=os.getenv("GOOGLE_API_KEY"))
+    cache = VectorCache(os.path.join(cache_dir, model.replace('/', '_'))) if cache_dir else None
+    return CachedEmbeddings(inner, model, cache, **options)
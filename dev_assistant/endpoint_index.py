@@ -0,0 +1,214 @@
+import bisect
+import json
+import os
+import re
+import threading
+from typing import Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+ENDPOINT_INDEX_PATH = os.getenv(
+    "ENDPOINT_INDEX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "endpoint_index.json"))
+
+BASE_URL = "https://api.creditchek.africa/v2"
+
+# "POST /identity/verifyNIN", "/identity/verifyNIN" or a full URL in a question
+PATH_PATTERN = re.compile(
+    r"(?:\b(GET|POST|PUT|DELETE|PATCH)\s+)?(?:https?://[^\s/]+(?:/v\d+)?|(?<![\w/]))(/[\w\-./{}:]*\w[}]?)",
+    re.IGNORECASE)
+
+# Parameter names worth looking up: snake_case, camelCase or `quoted`
+IDENTIFIER_PATTERN = re.compile(r"`(\w+)`|\b([a-z]+_\w+|[a-z]+[A-Z]\w*)\b")
+
+
+def normalize_path(path):
+    path = path.split('?')[0].split('#')[0]
+    if path.lower().startswith(BASE_URL):
+        path = path[len(BASE_URL):]
+    return '/' + path.strip('/').lower()
+
+
+class EndpointIndex:
+    """Exact lookup from API method, path and parameter name to doc chunks
+
+    paths maps a normalised path to [(method, chunk id)], params maps a
+    lower-cased parameter name to chunk ids, and chunks holds the text of
+    every chunk referenced, so a hit needs neither embedding nor vector
+    search. A sorted copy of the paths answers prefix queries by bisection.
+    """
+
+    def __init__(self, paths=None, params=None, chunks=None):
+        self.paths = paths or {}
+        self.params = params or {}
+        self.chunks = chunks or {}
+        self._sorted = sorted(self.paths)
+
+    def __len__(self):
+        return len(self.paths)
+
+    @classmethod
+    def build(cls, chunks, api_info=None):
+        """Index (chunk id, Document) pairs using api_info per source URL
+
+        api_info defaults to the chunks' own metadata["api_info"], as on
+        DocumentScraper's documents. Each endpoint or parameter points at
+        the chunks of its page that mention it, or at the page's first chunk
+        when none does.
+        """
+        index = cls()
+        by_source = {}
+        for id_, doc in chunks:
+            by_source.setdefault(doc.metadata["source"], []).append((id_, doc))
+        if api_info is None:
+            api_info = {doc.metadata["source"]: doc.metadata["api_info"]
+                        for _, doc in chunks if doc.metadata.get("api_info")}
+
+        for source, info in api_info.items():
+            page = by_source.get(source)
+            if not page:
+                continue
+
+            def mentions(name):
+                found = [id_ for id_, doc in page if name.lower() in doc.page_content.lower()]
+                return found or [page[0][0]]
+
+            for method, endpoint in zip(info.get("methods", []), info.get("endpoints", [])):
+                path = normalize_path(endpoint)
+                for id_ in mentions(endpoint.split('?')[0]):
+                    entry = [method.upper(), id_]
+                    if entry not in index.paths.setdefault(path, []):
+                        index.paths[path].append(entry)
+            for param in info.get("parameters", []):
+                name = param.get("name", "").strip()
+                if len(name) < 2 or ' ' in name:
+                    continue
+                ids = index.params.setdefault(name.lower(), [])
+                ids.extend(id_ for id_ in mentions(name) if id_ not in ids)
+
+        referenced = {id_ for entries in index.paths.values() for _, id_ in entries}
+        referenced.update(id_ for ids in index.params.values() for id_ in ids)
+        for id_, doc in chunks:
+            if id_ in referenced:
+                index.chunks[id_] = {"text": doc.page_content, "source": doc.metadata["source"]}
+        index._sorted = sorted(index.paths)
+        return index
+
+    @classmethod
+    def load(cls, path=ENDPOINT_INDEX_PATH):
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["paths"], data["params"], data["chunks"])
+
+    def save(self, path=ENDPOINT_INDEX_PATH):
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({"paths": self.paths, "params": self.params, "chunks": self.chunks}, f)
+        os.replace(tmp, path)
+
+    def lookup(self, question, limit=4):
+        """Return (chunk ids from exact or prefix endpoint hits, chunk ids from parameter hits)"""
+        endpoint_ids = []
+        for method, raw in PATH_PATTERN.findall(question):
+            path = normalize_path(raw)
+            method = method.upper()
+            if path in self.paths:
+                entries = self.paths[path]
+                matching = [id_ for m, id_ in entries if m == method] if method else []
+                candidates = matching or [id_ for _, id_ in entries]
+            else:
+                # Prefix: "/identity" finds every /identity/... endpoint
+                start = bisect.bisect_left(self._sorted, path.rstrip('/') + '/')
+                candidates = []
+                for key in self._sorted[start:start + limit]:
+                    if not key.startswith(path.rstrip('/') + '/'):
+                        break
+                    candidates.extend(id_ for _, id_ in self.paths[key])
+            endpoint_ids.extend(id_ for id_ in candidates if id_ not in endpoint_ids)
+
+        param_ids = []
+        for quoted, bare in IDENTIFIER_PATTERN.findall(question):
+            for id_ in self.params.get((quoted or bare).lower(), ()):
+                if id_ not in param_ids and id_ not in endpoint_ids:
+                    param_ids.append(id_)
+        return endpoint_ids[:limit], param_ids[:limit]
+
+    def documents(self, ids):
+        return [Document(id=id_, page_content=self.chunks[id_]["text"],
+                         metadata={"source": self.chunks[id_]["source"], "match": "endpoint_index"})
+                for id_ in ids if id_ in self.chunks]
+
+
+class EndpointIndexFile:
+    """The index saved at path, reloaded whenever ingestion rewrites it
+
+    current() stats the file on every call, which costs microseconds, and
+    loads it again when its modification time or size changed. A missing
+    file gives an empty index, so one written after startup is picked up.
+    """
+
+    def __init__(self, path=ENDPOINT_INDEX_PATH):
+        self.path = path
+        self.reloads = 0
+        self._stamp = None
+        self._index = EndpointIndex()
+        self._lock = threading.Lock()
+
+    def current(self):
+        try:
+            stat = os.stat(self.path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stamp = None
+        with self._lock:
+            if stamp != self._stamp:
+                try:
+                    self._index = EndpointIndex.load(self.path) if stamp else EndpointIndex()
+                except (FileNotFoundError, ValueError):
+                    # Replaced or removed between stat and open; try again next call
+                    return self._index
+                self._stamp = stamp
+                self.reloads += 1
+            return self._index
+
+
+class EndpointFirstRetriever(BaseRetriever):
+    """Answers from the endpoint index when a question names an endpoint
+
+    An exact or prefix endpoint hit skips vector search entirely. Hits on
+    parameter names only are put ahead of the vector results, deduplicated.
+    Pass index_file instead of index to follow re-ingestion without a restart.
+    """
+
+    index: Optional[EndpointIndex] = None
+    index_file: Optional[EndpointIndexFile] = None
+    vector_retriever: BaseRetriever
+    k: int = 4
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _index(self):
+        return self.index_file.current() if self.index_file is not None else self.index
+
+    def _merge(self, param_docs, vector_docs):
+        seen = {doc.page_content for doc in param_docs}
+        return (param_docs + [doc for doc in vector_docs if doc.page_content not in seen])[:self.k]
+
+    def _get_relevant_documents(self, query, *, run_manager: CallbackManagerForRetrieverRun):
+        index = self._index()
+        endpoint_ids, param_ids = index.lookup(query, self.k)
+        if endpoint_ids:
+            return index.documents(endpoint_ids)
+        vector_docs = self.vector_retriever.invoke(
+            query, config={"callbacks": run_manager.get_child()})
+        return self._merge(index.documents(param_ids), vector_docs)
+
+    async def _aget_relevant_documents(self, query, *, run_manager: AsyncCallbackManagerForRetrieverRun):
+        index = self._index()
+        endpoint_ids, param_ids = index.lookup(query, self.k)
+        if endpoint_ids:
+            return index.documents(endpoint_ids)
+        vector_docs = await self.vector_retriever.ainvoke(
+            query, config={"callbacks": run_manager.get_child()})
+        return self._merge(index.documents(param_ids), vector_docs)
@@ -0,0 +1,270 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+INDEX_NAME = "creditchek-dev-assistant"
+
+# "pinecone" or "local"; the local store lives in LOCAL_STORE_DIR
+VECTOR_STORE = os.getenv("VECTOR_STORE", "pinecone")
+LOCAL_STORE_DIR = os.getenv(
+    "LOCAL_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".vector_store"))
+
+# Below this many vectors the approximate index is not worth building
+MIN_INDEX_SIZE = 5000
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def kmeans(vectors, clusters, iterations=10, seed=0):
+    """Spherical k-means: unit centroids maximising cosine similarity"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = (vectors @ centroids.T).argmax(axis=1)
+        for c in range(clusters):
+            members = vectors[assignment == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+        centroids = _normalize(centroids)
+    return centroids
+
+
+class LocalVectorStore(VectorStore):
+    """Cosine-similarity vector store kept on local disk
+
+    Unit-normalised float32 vectors sit in a memory-mapped matrix that
+    stays dense: deleting a row moves the last row into its place. Texts
+    and metadata live in SQLite. Queries are exact top-k by default; with
+    approximate=True an IVF index (spherical k-means lists, nprobe of them
+    scanned per query) is built once the store holds MIN_INDEX_SIZE
+    vectors. Changes are written through, so the store needs no explicit
+    save. Another process may write to the same directory (ingestion while
+    the app serves): a search first checks SQLite's data_version and, if
+    another connection has committed since, reloads the row mapping and
+    remaps the matrix.
+    """
+
+    def __init__(self, embedding, directory=LOCAL_STORE_DIR, approximate=False, nprobe=8):
+        self.embedding = embedding
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.approximate = approximate
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        self.db = sqlite3.connect(self.directory / 'documents.sqlite3', isolation_level=None,
+                                  check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS documents (
+            id TEXT PRIMARY KEY, row INTEGER UNIQUE NOT NULL,
+            text TEXT NOT NULL, metadata TEXT NOT NULL)''')
+        self.db.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)')
+
+        self.dim = None
+        self.matrix = None
+        self._load()
+
+    def _data_version(self):
+        return self.db.execute('PRAGMA data_version').fetchone()[0]
+
+    def _load(self):
+        """Read the row mapping, matrix and approximate index from disk"""
+        self._version = self._data_version()
+        dim = self.db.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        self.dim = dim[0] if dim else None
+        self.ids = [id_ for id_, in self.db.execute('SELECT id FROM documents ORDER BY row')]
+        self.rows = {id_: row for row, id_ in enumerate(self.ids)}
+        self.matrix = None
+        if self.dim:
+            self._open()
+        self.centroids = self.assignment = None
+        if (self.directory / 'centroids.npy').exists() and self.ids:
+            self.centroids = np.load(self.directory / 'centroids.npy')
+            self.assignment = self._assign(self.matrix[:len(self.ids)])
+
+    def _refresh(self):
+        # data_version only changes when another connection commits
+        if self._data_version() != self._version:
+            self._load()
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _open(self, rows=None):
+        path = self.directory / 'vectors.f32'
+        size = path.stat().st_size if path.exists() else 0
+        if rows is not None and rows * self.dim * 4 > size:
+            self.matrix = None
+            with open(path, 'ab') as f:
+                f.truncate(rows * self.dim * 4)
+            size = rows * self.dim * 4
+        rows = size // (self.dim * 4)
+        self.matrix = np.memmap(path, np.float32, 'r+', shape=(rows, self.dim)) if rows else None
+
+    def _assign(self, vectors):
+        return (vectors @ self.centroids.T).argmax(axis=1).astype(np.int32)
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = list(ids) if ids else [uuid.uuid4().hex for _ in texts]
+        vectors = _normalize(self.embedding.embed_documents(texts))
+        with self._lock:
+            self._refresh()
+            # Upsert: replacing an ID removes its old row first
+            self.delete([id_ for id_ in ids if id_ in self.rows])
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self.db.execute("INSERT OR IGNORE INTO meta VALUES ('dim', ?)", (self.dim,))
+            start = len(self.ids)
+            needed = start + len(texts)
+            if self.matrix is None or needed > len(self.matrix):
+                current = 0 if self.matrix is None else len(self.matrix)
+                self._open(max(needed, 1024, 2 * current))
+            self.matrix[start:needed] = vectors
+            self.matrix.flush()
+            with self.db:
+                self.db.executemany('INSERT INTO documents VALUES (?, ?, ?, ?)', [
+                    (id_, start + i, text, json.dumps(metadata))
+                    for i, (id_, text, metadata) in enumerate(zip(ids, texts, metadatas))])
+            for i, id_ in enumerate(ids):
+                self.rows[id_] = start + i
+            self.ids.extend(ids)
+            if self.assignment is not None:
+                self.assignment = np.concatenate([self.assignment, self._assign(vectors)])
+        return ids
+
+    def delete(self, ids=None, delete_all=False, **kwargs):
+        with self._lock:
+            self._refresh()
+            if delete_all:
+                with self.db:
+                    self.db.execute('DELETE FROM documents')
+                self.ids, self.rows = [], {}
+                self.drop_index()
+                return True
+            for id_ in ids or ():
+                row = self.rows.pop(id_, None)
+                if row is None:
+                    continue
+                last = len(self.ids) - 1
+                with self.db:
+                    self.db.execute('DELETE FROM documents WHERE id = ?', (id_,))
+                    if row != last:
+                        moved = self.ids[last]
+                        self.matrix[row] = self.matrix[last]
+                        self.db.execute('UPDATE documents SET row = ? WHERE id = ?', (row, moved))
+                        self.ids[row] = moved
+                        self.rows[moved] = row
+                        if self.assignment is not None:
+                            self.assignment[row] = self.assignment[last]
+                self.ids.pop()
+                if self.assignment is not None:
+                    self.assignment = self.assignment[:-1]
+            if self.matrix is not None:
+                self.matrix.flush()
+            return True
+
+    def build_index(self, lists=None, iterations=10):
+        """(Re)build the approximate index; lists defaults to about sqrt(n)"""
+        with self._lock:
+            self._refresh()
+            vectors = np.asarray(self.matrix[:len(self.ids)])
+            lists = lists or max(1, min(len(vectors), int(np.sqrt(len(vectors)))))
+            # A sample is plenty to place the centroids
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(len(vectors), min(len(vectors), 256 * lists), replace=False)]
+            self.centroids = kmeans(sample, lists, iterations)
+            self.assignment = self._assign(vectors)
+            np.save(self.directory / 'centroids.npy', self.centroids)
+
+    def drop_index(self):
+        self.centroids = self.assignment = None
+        (self.directory / 'centroids.npy').unlink(missing_ok=True)
+
+    def search_vector(self, vector, k=4, approximate=None):
+        """Return [(row, cosine similarity)] of the k nearest vectors"""
+        approximate = self.approximate if approximate is None else approximate
+        query = _normalize(vector)
+        with self._lock:
+            self._refresh()
+            count = len(self.ids)
+            if not count:
+                return []
+            if approximate and self.centroids is None and count >= MIN_INDEX_SIZE:
+                self.build_index()
+            if approximate and self.centroids is not None:
+                probe = np.argpartition(-(self.centroids @ query),
+                                        min(self.nprobe, len(self.centroids)) - 1)[:self.nprobe]
+                candidates = np.flatnonzero(np.isin(self.assignment, probe))
+                scores = self.matrix[candidates] @ query
+            else:
+                candidates = None
+                scores = self.matrix[:count] @ query
+        k = min(k, len(scores))
+        if not k:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        rows = top if candidates is None else candidates[top]
+        return [(int(row), float(score)) for row, score in zip(rows, scores[top])]
+
+    def _documents(self, hits):
+        if not hits:
+            return []
+        with self._lock:
+            ids = [self.ids[row] for row, _ in hits]
+            marks = ','.join('?' * len(ids))
+            found = {id_: (text, metadata) for id_, text, metadata in self.db.execute(
+                f'SELECT id, text, metadata FROM documents WHERE id IN ({marks})', ids)}
+        # An ID another process deleted since the search is left out
+        return [(Document(id=id_, page_content=found[id_][0], metadata=json.loads(found[id_][1])),
+                 score) for id_, (_, score) in zip(ids, hits) if id_ in found]
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, **kwargs):
+        return self._documents(self.search_vector(embedding, k, kwargs.get('approximate')))
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector_with_score(
+            self.embedding.embed_query(query), k, **kwargs)
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, **kwargs)]
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1) / 2
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, **kwargs):
+        store = cls(embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids)
+        return store
+
+
+def open_vector_store(embedding, backend=VECTOR_STORE):
+    """The vector store named by VECTOR_STORE: "pinecone" or "local" """
+    if backend == "local":
+        return LocalVectorStore(embedding, approximate=os.getenv("LOCAL_STORE_APPROXIMATE") == "1")
+    from langchain_pinecone import PineconeVectorStore
+
+    return PineconeVectorStore(index_name=INDEX_NAME, embedding=embedding,
+                               pinecone_api_key=os.getenv("PINECONE_API_KEY"))
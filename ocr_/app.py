@@ -1,19 +1,39 @@
 import cv2
 import json
+import os
 import re
 import tempfile
-from passporteye import read_mrz
-import easyocr
-import pytesseract
+import time
 
-# Update this path to match your Tesseract installation
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'  # 👈 Double-check this path!
+import numpy as np
 
-# Initialize EasyOCR reader once for better performance
-reader = easyocr.Reader(['en'])
+import readers
+from capture import capture_best_frame
+from classify import MIN_CONFIDENCE, classify_document
+from dedupe import DedupeCache, phash, thumbnail
+from preprocess import load_image
 
-def capture_image():
-    """Capture image from webcam when 's' is pressed."""
+# Running cost of MRZ attempts, used to report the time routing saves
+mrz_timings = {'attempts': 0, 'seconds': 0.0}
+
+# Prior for that cost, counted as one attempt, so a NIN-only workload that
+# never runs the MRZ search still reports a saving. PassportEye's box
+# search alone takes about 0.25s on the sample NIMC slip, before any
+# tesseract call, so the default is a lower bound; set the measured cost
+MRZ_SECONDS = float(os.getenv('OCR_MRZ_SECONDS', '0.25'))
+
+# Earlier results for re-submitted cards, keyed by perceptual hash and
+# confirmed by comparing thumbnails block by block
+dedupe_cache = DedupeCache()
+
+def capture_image(auto=False):
+    """Capture image from webcam when 's' is pressed.
+
+    With auto=True frames are scored in the background and the best
+    recent one is returned once it is sharp and glare-free enough.
+    """
+    if auto:
+        return capture_best_frame()
     cap = cv2.VideoCapture(0)
     print("Press 's' to capture image, 'q' to quit...")
     while True:
@@ -33,9 +53,11 @@ def capture_image():
 
 def process_passport(image):
     """Process image to extract passport data using PassportEye."""
-    #with tempfile.NamedTemporaryFile(suffix='.jpg') as temp:
-        #cv2.imwrite(temp.name, image)
-    mrz = read_mrz(image)
+    image = load_image(image)
+    started = time.perf_counter()
+    mrz = readers.mrz_reader()(image.mrz)
+    mrz_timings['attempts'] += 1
+    mrz_timings['seconds'] += time.perf_counter() - started
     if mrz:
         mrz_data = mrz.to_dict()
         return {
@@ -56,10 +78,57 @@ def process_passport(image):
 
 def process_nin(image):
     """Process image to extract NIN slip data using EasyOCR and regex."""
-    #rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    results = reader.readtext(image, detail=0, paragraph=True)
-    text = '\n'.join(results)
-    
+    image = load_image(image)
+    with readers.pool.reader() as reader:
+        results = reader.readtext(image.ocr, detail=0, paragraph=True)
+    return parse_nin_text('\n'.join(results))
+
+
+def process_nin_batch(images, batch_size=16):
+    """Run NIN extraction over many images with batched EasyOCR calls
+
+    readtext_batched needs equal sizes, so images are grouped by aspect
+    ratio and each is padded at the bottom and right to its group's
+    largest height and width; nothing is stretched or upscaled, and
+    readtext_batched's own resize to that shape is then a no-op. Returns
+    one process_nin-style dict per image, in input order.
+    """
+    prepared = [load_image(image) for image in images]
+    if not prepared:
+        return []
+    groups = {}
+    for index, image in enumerate(prepared):
+        height, width = image.ocr.shape
+        groups.setdefault(round(width / height * 4) / 4, []).append(index)
+
+    outputs = [None] * len(prepared)
+    with readers.pool.reader() as reader:
+        for indices in groups.values():
+            for start in range(0, len(indices), batch_size):
+                chunk = indices[start:start + batch_size]
+                height = max(prepared[i].ocr.shape[0] for i in chunk)
+                width = max(prepared[i].ocr.shape[1] for i in chunk)
+                results = reader.readtext_batched(
+                    [pad_to(prepared[i].ocr, height, width) for i in chunk],
+                    n_width=width, n_height=height,
+                    batch_size=batch_size, detail=0, paragraph=True)
+                for i, lines in zip(chunk, results):
+                    outputs[i] = parse_nin_text('\n'.join(lines))
+    return outputs
+
+
+def pad_to(gray, height, width):
+    """Pad a grayscale image to height x width with its own background level"""
+    bottom, right = height - gray.shape[0], width - gray.shape[1]
+    if not bottom and not right:
+        return gray
+    border = np.concatenate([gray[0], gray[-1], gray[:, 0], gray[:, -1]])
+    return cv2.copyMakeBorder(gray, 0, bottom, 0, right, cv2.BORDER_CONSTANT,
+                              value=int(np.median(border)))
+
+
+def parse_nin_text(text):
+    """Pull NIN, name and gender out of OCR text from a NIN slip"""
     # Extract NIN (11 digits)
     nin = re.search(r'\b\d{11}\b', text)
     # Extract full name (case-insensitive, multi-line)
@@ -79,25 +148,112 @@ def process_nin(image):
         }
     }
 
+def extract_document(image):
+    """Classify the image first and run only the extractor it calls for
+
+    The MRZ search is still tried after an empty NIN result when the
+    classifier was unsure, so routing does not cost accuracy. A
+    resubmission of an earlier image returns that image's result
+    without running OCR, including a re-encoded or resized copy.
+    """
+    image = load_image(image)
+    key, thumb = phash(image.ocr), thumbnail(image.ocr)
+    cached, distance = dedupe_cache.lookup(key, thumb)
+    if cached is not None:
+        cached['dedupe'] = {'hit': True, 'distance': distance}
+        return cached
+
+    started = time.perf_counter()
+    classification = classify_document(image)
+    output = None
+    tried_mrz = False
+
+    if classification['type'] == 'passport':
+        output = process_passport(image)
+        tried_mrz = True
+    if output is None:
+        output = process_nin(image)
+        if (not tried_mrz and classification['confidence'] < MIN_CONFIDENCE
+                and output['data']['nin'] is None):
+            output = process_passport(image) or output
+            tried_mrz = True
+
+    output = _with_routing(output, classification, tried_mrz)
+    dedupe_cache.store(key, thumb, output, time.perf_counter() - started)
+    output['dedupe'] = {'hit': False}
+    return output
+
+
+def extract_documents(images, batch_size=16):
+    """extract_document over many images, sharing batched NIN OCR calls"""
+    images = [load_image(image) for image in images]
+    keys = [(phash(image.ocr), thumbnail(image.ocr)) for image in images]
+    outputs = [None] * len(images)
+    for i, (key, thumb) in enumerate(keys):
+        cached, distance = dedupe_cache.lookup(key, thumb)
+        if cached is not None:
+            cached['dedupe'] = {'hit': True, 'distance': distance}
+            outputs[i] = cached
+
+    misses = [i for i, output in enumerate(outputs) if output is None]
+    started = time.perf_counter()
+    extracted = _extract_batch([images[i] for i in misses], batch_size)
+    seconds = (time.perf_counter() - started) / max(1, len(misses))
+    for i, output in zip(misses, extracted):
+        dedupe_cache.store(*keys[i], output, seconds)
+        output['dedupe'] = {'hit': False}
+        outputs[i] = output
+    return outputs
+
+
+def _extract_batch(images, batch_size):
+    classifications = [classify_document(image) for image in images]
+    outputs = [None] * len(images)
+    tried_mrz = [False] * len(images)
+
+    for i, image in enumerate(images):
+        if classifications[i]['type'] == 'passport':
+            outputs[i] = process_passport(image)
+            tried_mrz[i] = True
+
+    pending = [i for i, output in enumerate(outputs) if output is None]
+    for i, output in zip(pending, process_nin_batch([images[i] for i in pending], batch_size)):
+        if (not tried_mrz[i] and classifications[i]['confidence'] < MIN_CONFIDENCE
+                and output['data']['nin'] is None):
+            output = process_passport(images[i]) or output
+            tried_mrz[i] = True
+        outputs[i] = output
+
+    return [_with_routing(output, classification, tried)
+            for output, classification, tried in zip(outputs, classifications, tried_mrz)]
+
+
+def _with_routing(output, classification, tried_mrz):
+    mean = (MRZ_SECONDS + mrz_timings['seconds']) / (1 + mrz_timings['attempts'])
+    classification['mrz_skipped'] = not tried_mrz
+    classification['estimated_seconds_saved'] = 0.0 if tried_mrz else round(mean, 3)
+    output['classification'] = classification
+    return output
+
+
 def main():
-    #image = capture_image()
+    #image = capture_image(auto=True)
     ###if image is None:
         #print("No image captured.")
         #return
     
-    # Attempt Passport processing
-    passport_data = process_passport("NIMC ID CARD_20230809_124805_991_70 (1).jpg")
-    if passport_data:
-        output = passport_data
-    else:
-        # Fallback to NIN processing
-        output = process_nin("NIMC ID CARD_20230809_124805_991_70 (1).jpg")
+    started = time.perf_counter()
+    # Decode once, classify, then run the matching extractor
+    output = extract_document("NIMC ID CARD_20230809_124805_991_70 (1).jpg")
     
     # Save to JSON
     with open('output.json', 'w') as f:
         json.dump(output, f, indent=2)
     print("Extracted Data:")
     print(json.dumps(output, indent=2))
+    print(f"Processed in {time.perf_counter() - started:.2f}s "
+          f"(reader load: {readers.pool.stats()['load_seconds']}, "
+          f"dedupe: {dedupe_cache.stats()})")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,113 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import readers
+from app import process_nin, process_nin_batch
+from preprocess import load_image
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp'}
+
+
+def collect_images(source):
+    """Return the image paths in a directory, or listed one per line in a manifest"""
+    source = Path(source)
+    if source.is_dir():
+        return sorted(str(path) for path in source.rglob('*')
+                      if path.suffix.lower() in IMAGE_SUFFIXES)
+
+    with open(source) as manifest:
+        return [line.strip() for line in manifest if line.strip() and not line.startswith('#')]
+
+
+def run_batch(paths, out, chunk_size=64, batch_size=16, outputs=None):
+    """Extract NIN slips chunk by chunk and stream one JSON line per image
+
+    An image that cannot be decoded gets an error line instead of ending
+    the run. If outputs is a dict, each result is also stored in it by path.
+    """
+    done = failed = 0
+    started = time.perf_counter()
+    for start in range(0, len(paths), chunk_size):
+        chunk = paths[start:start + chunk_size]
+        images, records = [], []
+        for path in chunk:
+            try:
+                images.append(load_image(path))
+                records.append(None)
+            except Exception as e:
+                records.append({'file': path, 'error': f"{type(e).__name__}: {e}"})
+
+        results = iter(process_nin_batch(images, batch_size))
+        for path, record in zip(chunk, records):
+            if record is None:
+                output = next(results)
+                record = {'file': path, **output}
+                if outputs is not None:
+                    outputs[path] = output
+            else:
+                failed += 1
+            out.write(json.dumps(record) + '\n')
+        out.flush()
+        done += len(chunk)
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        print(f"\r[{done}/{len(paths)}] {failed} failed, {done / elapsed:.2f} images/s",
+              end='', file=sys.stderr, flush=True)
+
+    print(file=sys.stderr)
+    return {'images': done, 'failed': failed, 'duration': round(time.perf_counter() - started, 2)}
+
+
+def time_loop(paths, expected=None):
+    """Seconds taken by the one-image-at-a-time process_nin loop
+
+    With expected (path -> batched output), also returns how many
+    process_nin results differ from the batched ones.
+    """
+    started = time.perf_counter()
+    outputs = {}
+    for path in paths:
+        try:
+            outputs[path] = process_nin(path)
+        except Exception:
+            continue
+    seconds = time.perf_counter() - started
+    if expected is None:
+        return seconds
+    return seconds, sum(outputs.get(path) != output for path, output in expected.items())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract NIN slips in bulk with batched OCR")
+    parser.add_argument('source', help="directory of images or a manifest with one path per line")
+    parser.add_argument('-o', '--output', help="JSONL output file (default: stdout)")
+    parser.add_argument('--chunk', type=int, default=64, help="images decoded and read per call")
+    parser.add_argument('--batch-size', type=int, default=16, help="EasyOCR recognition batch size")
+    parser.add_argument('--compare-loop', action='store_true',
+                        help="also time a process_nin loop over the same images and "
+                             "count results that differ from the batched ones")
+    args = parser.parse_args(argv)
+
+    paths = collect_images(args.source)
+    # Load the model up front so neither timing includes it
+    readers.pool.warm_up()
+    outputs = {} if args.compare_loop else None
+    if args.output:
+        with open(args.output, 'w') as out:
+            summary = run_batch(paths, out, args.chunk, args.batch_size, outputs)
+    else:
+        summary = run_batch(paths, sys.stdout, args.chunk, args.batch_size, outputs)
+    summary['images_per_second'] = round(summary['images'] / max(summary['duration'], 1e-9), 2)
+
+    if args.compare_loop:
+        seconds, mismatches = time_loop(paths, outputs)
+        summary['loop_images_per_second'] = round(len(paths) / max(seconds, 1e-9), 2)
+        # Images whose batched result is not the dict process_nin returns
+        summary['loop_mismatches'] = mismatches
+    print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
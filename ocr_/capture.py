@@ -0,0 +1,241 @@
+import collections
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from preprocess import MIN_DOCUMENT_AREA
+
+# Frames are scored on a copy this wide; enough to judge focus and glare
+ANALYSIS_WIDTH = 480
+
+# Laplacian variance at ANALYSIS_WIDTH above which card text reads cleanly.
+# The NIMC sample at 1280px scores about 8500 sharp, 4000 under a sigma-1
+# Gaussian blur, 2000 at sigma 1.5, 1000 at sigma 2 and 280 at sigma 3
+SHARPNESS_TARGET = 1500.0
+
+# Seconds wait_for keeps watching after the first frame good enough, so a
+# sharper frame arriving just after it is picked instead
+SETTLE_SECONDS = 0.5
+
+# Glare is blobs of pixels at or above GLARE_LEVEL, at least MIN_GLARE_BLOB
+# of the document area each, on a card whose paper is darker than
+# PAPER_SATURATED. When the paper itself is that bright (scans, white stock
+# under strong light) highlights cannot be told from it and none is
+# counted. A glare share above MAX_GLARE zeroes the score
+GLARE_LEVEL = 250
+PAPER_SATURATED = 240
+MIN_GLARE_BLOB = 0.001
+MAX_GLARE = 0.08
+
+# Webcam frames are requested at this size; EasyOCR works on at most
+# preprocess.OCR_MAX_SIDE anyway, so larger frames only cost decode time
+CAPTURE_RESOLUTION = (1280, 720)
+
+
+def _document_quad(gray):
+    """(area share, bounding box) of the largest four-sided contour, (0, None) when there is none"""
+    edges = cv2.dilate(cv2.Canny(gray, 50, 150), None, iterations=2)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    best, box = 0.0, None
+    for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:5]:
+        quad = cv2.approxPolyDP(contour, 0.03 * cv2.arcLength(contour, True), True)
+        if len(quad) == 4 and cv2.isContourConvex(quad):
+            area = cv2.contourArea(quad) / float(gray.size)
+            if area > best:
+                best, box = area, cv2.boundingRect(quad)
+    return best, box
+
+
+def _glare(gray):
+    """Share of the area covered by specular highlights brighter than the paper"""
+    threshold, _ = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    paper = gray[gray > threshold]
+    if not paper.size or np.median(paper) >= PAPER_SATURATED:
+        return 0.0
+    # Opening drops single bright pixels; what remains is counted blob by blob
+    mask = cv2.morphologyEx((gray >= GLARE_LEVEL).astype(np.uint8), cv2.MORPH_OPEN,
+                            np.ones((3, 3), np.uint8))
+    _, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    return areas[areas >= MIN_GLARE_BLOB * gray.size].sum() / float(gray.size)
+
+
+def frame_quality(frame):
+    """Score a BGR frame for OCR: {'score', 'sharpness', 'glare', 'document'}
+
+    score is in [0, 1]: document presence times focus times a glare
+    penalty. A card filling the frame shows no outline, so dense edges
+    count as partial presence. Glare is measured inside the document
+    outline when there is one.
+    """
+    height, width = frame.shape[:2]
+    scale = ANALYSIS_WIDTH / float(width)
+    small = cv2.resize(frame, (ANALYSIS_WIDTH, max(1, int(height * scale))),
+                       interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    area, box = _document_quad(gray)
+    region = gray
+    if area >= MIN_DOCUMENT_AREA:
+        document = 1.0
+        x, y, w, h = box
+        region = gray[y:y + h, x:x + w]
+    else:
+        edge_density = np.count_nonzero(cv2.Canny(gray, 50, 150)) / float(gray.size)
+        document = 0.7 * min(1.0, edge_density / 0.08)
+
+    sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+    glare = _glare(region)
+    score = (document * min(1.0, sharpness / SHARPNESS_TARGET)
+             * max(0.0, 1.0 - glare / MAX_GLARE))
+    return {
+        'score': round(float(score), 3),
+        'sharpness': round(float(sharpness), 1),
+        'glare': round(float(glare), 4),
+        'document': round(float(document), 3),
+    }
+
+
+class FrameGrabber:
+    """Reads and scores camera frames on a background thread
+
+    The last buffer_size frames are kept with their quality, so the best
+    recent one can be picked without blocking on the camera. source is a
+    cv2.VideoCapture argument or anything with read() and release().
+    """
+
+    def __init__(self, source=0, buffer_size=30, resolution=CAPTURE_RESOLUTION):
+        self.source = source
+        self.resolution = resolution
+        self.frames = collections.deque(maxlen=buffer_size)
+        self.frames_read = 0
+        self.scoring_seconds = 0.0
+        self._changed = threading.Condition()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._capture = None
+
+    def start(self):
+        if hasattr(self.source, 'read'):
+            self._capture = self.source
+        else:
+            self._capture = cv2.VideoCapture(self.source)
+            if self.resolution:
+                self._capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolution[0])
+                self._capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution[1])
+        self._thread = threading.Thread(target=self._run, name='frame-grabber', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._capture is not None:
+            self._capture.release()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            ok, frame = self._capture.read()
+            if not ok:
+                break
+            started = time.perf_counter()
+            quality = frame_quality(frame)
+            self.scoring_seconds += time.perf_counter() - started
+            with self._changed:
+                self.frames.append((time.monotonic(), quality, frame))
+                self.frames_read += 1
+                self._changed.notify_all()
+        with self._changed:
+            self._changed.notify_all()
+
+    def latest(self):
+        """(frame, quality) most recently read, or (None, None)"""
+        with self._changed:
+            if not self.frames:
+                return None, None
+            _, quality, frame = self.frames[-1]
+            return frame, quality
+
+    def best(self, max_age=1.0):
+        """(frame, quality) of the best frame read in the last max_age seconds"""
+        with self._changed:
+            return self._best(max_age)
+
+    def _best(self, max_age):
+        cutoff = time.monotonic() - max_age
+        recent = [item for item in self.frames if item[0] >= cutoff]
+        if not recent:
+            return None, None
+        # Sharpness breaks ties, e.g. between frames that all score 0 or 1
+        _, quality, frame = max(recent, key=lambda item: (item[1]['score'], item[1]['sharpness']))
+        return frame, quality
+
+    def wait_for(self, min_score=0.6, timeout=10.0, max_age=1.0, settle=SETTLE_SECONDS):
+        """Block until a recent frame scores min_score, then settle seconds more
+
+        Returns the best recent (frame, quality) either way, so callers
+        can decide what to do with a mediocre frame. max_age should cover
+        settle, or the first good frame can age out of the comparison.
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                frame, quality = self._best(max_age)
+                if quality is not None and quality['score'] >= min_score:
+                    deadline = min(deadline, time.monotonic() + settle)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.running:
+                    return frame, quality
+                self._changed.wait(remaining)
+
+    def stats(self):
+        return {
+            'frames_read': self.frames_read,
+            'buffered': len(self.frames),
+            'mean_scoring_ms': round(1000 * self.scoring_seconds / self.frames_read, 2)
+            if self.frames_read else 0.0,
+        }
+
+
+def capture_best_frame(source=0, min_score=0.6, timeout=10.0, show=True, settle=SETTLE_SECONDS):
+    """Return the best webcam frame seen within settle seconds of the first
+    good one, or the best one seen by timeout
+
+    With show=True a preview window displays the live score; 'q' cancels
+    and returns None.
+    """
+    with FrameGrabber(source) as grabber:
+        if not show:
+            frame, _ = grabber.wait_for(min_score, timeout, settle=settle)
+            return frame
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and grabber.running:
+            frame, quality = grabber.latest()
+            if frame is not None:
+                preview = frame.copy()
+                cv2.putText(preview, f"quality {quality['score']:.2f}", (20, 40),
+                            cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+                cv2.imshow('Live Capture', preview)
+            if cv2.waitKey(15) == ord('q'):
+                cv2.destroyAllWindows()
+                return None
+            frame, quality = grabber.best()
+            if quality is not None and quality['score'] >= min_score:
+                deadline = min(deadline, time.monotonic() + settle)
+        cv2.destroyAllWindows()
+        frame, _ = grabber.best()
+        return frame
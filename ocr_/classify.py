@@ -0,0 +1,80 @@
+import time
+
+import cv2
+import numpy as np
+
+THUMBNAIL_WIDTH = 320
+
+# Below this confidence an image classified as a NIN slip is still tried
+# for an MRZ when the NIN extractor comes back empty
+MIN_CONFIDENCE = 0.6
+
+# Passport data pages are ISO/IEC 7810 ID-3, about 125 x 88 mm
+PASSPORT_ASPECT = 125 / 88
+
+
+def _thumbnail(gray):
+    scale = THUMBNAIL_WIDTH / float(gray.shape[1])
+    return cv2.resize(gray, (THUMBNAIL_WIDTH, max(1, int(gray.shape[0] * scale))),
+                      interpolation=cv2.INTER_AREA)
+
+
+def mrz_band(gray):
+    """Score in [0, 1] for a machine-readable zone in the lower part of the image
+
+    Follows the usual blackhat + horizontal gradient + closing recipe on
+    a thumbnail: MRZ lines turn into one wide, short band spanning most
+    of the page width.
+    """
+    thumb = _thumbnail(gray)
+    height, width = thumb.shape
+    rect = cv2.getStructuringElement(cv2.MORPH_RECT, (13, 5))
+    square = cv2.getStructuringElement(cv2.MORPH_RECT, (21, 21))
+
+    blackhat = cv2.morphologyEx(cv2.GaussianBlur(thumb, (3, 3), 0), cv2.MORPH_BLACKHAT, rect)
+    grad = np.absolute(cv2.Sobel(blackhat, cv2.CV_32F, 1, 0, ksize=-1))
+    grad = (255 * (grad - grad.min()) / max(1e-6, grad.max() - grad.min())).astype(np.uint8)
+    grad = cv2.morphologyEx(grad, cv2.MORPH_CLOSE, rect)
+    _, mask = cv2.threshold(grad, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    mask = cv2.erode(cv2.morphologyEx(mask, cv2.MORPH_CLOSE, square), None, iterations=2)
+
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    best = 0.0
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if y + h / 2 < height * 0.55 or h == 0:
+            continue  # MRZ sits in the bottom part of the page
+        span = w / float(width)
+        if span < 0.6 or w / float(h) < 5:
+            continue
+        fill = cv2.contourArea(contour) / float(w * h)
+        best = max(best, min(1.0, span) * fill)
+    return best
+
+
+def classify_document(image):
+    """Guess whether a PreparedImage is a passport or a NIN slip
+
+    Returns {'type', 'confidence', 'seconds', 'mrz_score', 'aspect'}; type
+    is 'passport' or 'nin'.
+    """
+    started = time.perf_counter()
+    score = mrz_band(image.gray)
+    height, width = image.gray.shape
+    aspect = max(width, height) / float(min(width, height))
+    aspect_match = max(0.0, 1 - abs(aspect - PASSPORT_ASPECT) / PASSPORT_ASPECT)
+
+    if score >= 0.5:
+        kind = 'passport'
+        confidence = min(0.99, 0.6 + 0.3 * score + 0.1 * aspect_match)
+    else:
+        kind = 'nin'
+        confidence = min(0.99, 0.7 + 0.6 * (0.5 - score) - 0.1 * aspect_match)
+
+    return {
+        'type': kind,
+        'confidence': round(confidence, 3),
+        'seconds': round(time.perf_counter() - started, 4),
+        'mrz_score': round(score, 3),
+        'aspect': round(aspect, 3),
+    }
@@ -0,0 +1,157 @@
+import copy
+import os
+import threading
+
+import cv2
+import numpy as np
+
+# Side of the DCT block kept by phash; the hash has HASH_SIDE ** 2 bits
+HASH_SIDE = 16
+HASH_WORDS = HASH_SIDE ** 2 // 64
+
+# Width of the thumbnail kept per entry to verify a candidate (about 48 KB
+# each) and the side of the blocks compared
+VERIFY_WIDTH = 320
+VERIFY_BLOCK = 4
+
+# Entries kept, the largest Hamming distance for a candidate and the largest
+# block difference for a hit; set OCR_DEDUPE_SIZE=0 to turn the cache off.
+# The hash cannot see the fields that identify a person: the same slip with
+# another NIN and name stamped on it is 0-6 bits away. The block difference
+# can: on the sample slip, re-encodes down to q85 at 0.4x score 2-6 and a
+# q30 re-encode at 0.3x 16, while one changed digit or letter scores 47+
+DEDUPE_SIZE = int(os.getenv('OCR_DEDUPE_SIZE', '1024'))
+DEDUPE_DISTANCE = int(os.getenv('OCR_DEDUPE_DISTANCE', '8'))
+DEDUPE_PIXEL_DIFF = float(os.getenv('OCR_DEDUPE_PIXEL_DIFF', '30'))
+
+
+def phash(gray):
+    """256-bit perceptual hash of a grayscale image as HASH_WORDS uint64s
+
+    Low-frequency DCT coefficients of a 64x64 thumbnail compared with
+    their median: stable under re-compression and resizing, while the
+    extra bits over the usual 64 keep two cards of the same template apart.
+    """
+    thumb = cv2.resize(gray, (4 * HASH_SIDE, 4 * HASH_SIDE), interpolation=cv2.INTER_AREA)
+    low = cv2.dct(thumb.astype(np.float32))[:HASH_SIDE, :HASH_SIDE].ravel()
+    bits = low > np.median(low[1:])  # the DC term would skew the median
+    return np.packbits(bits).view('>u8').astype(np.uint64)
+
+
+def thumbnail(gray):
+    """VERIFY_WIDTH-wide copy of a grayscale image for pixel_difference"""
+    height = max(VERIFY_BLOCK, round(gray.shape[0] * VERIFY_WIDTH / gray.shape[1]))
+    return cv2.resize(gray, (VERIFY_WIDTH, height), interpolation=cv2.INTER_AREA)
+
+
+def pixel_difference(a, b):
+    """Largest mean absolute difference over VERIFY_BLOCK-sized blocks
+
+    Re-compression and resizing spread small errors over the whole image;
+    a changed character concentrates a large one in the blocks it covers,
+    which a whole-image mean or a hash would average away.
+    """
+    if a.shape != b.shape:
+        b = cv2.resize(b, (a.shape[1], a.shape[0]), interpolation=cv2.INTER_AREA)
+    rows, cols = a.shape[0] // VERIFY_BLOCK, a.shape[1] // VERIFY_BLOCK
+    diff = cv2.absdiff(a, b)[:rows * VERIFY_BLOCK, :cols * VERIFY_BLOCK].astype(np.float32)
+    return float(diff.reshape(rows, VERIFY_BLOCK, cols, VERIFY_BLOCK).mean(axis=(1, 3)).max())
+
+
+def hamming(hashes, target):
+    """Bit distance from target to each row of an (n, HASH_WORDS) array"""
+    return np.unpackbits((hashes ^ target).view(np.uint8), axis=1).sum(axis=1)
+
+
+class DedupeCache:
+    """Extraction results keyed by the perceptual hash of the document
+
+    Hashes live in one preallocated uint64 array, so finding candidates is
+    a single vectorised Hamming distance over every entry. The nearest
+    candidate whose thumbnail is within pixel_threshold of the query's is
+    returned, so a re-encoded or resized resubmission hits while a
+    different document that merely looks alike (another person's slip on
+    the same template) is never served; those are counted as near misses.
+    When full, the least recently used entry is replaced. Safe to share
+    between threads.
+    """
+
+    def __init__(self, max_entries=DEDUPE_SIZE, threshold=DEDUPE_DISTANCE,
+                 pixel_threshold=DEDUPE_PIXEL_DIFF):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self._hashes = np.zeros((max_entries, HASH_WORDS), dtype=np.uint64)
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._thumbnails = [None] * max_entries
+        self._results = [None] * max_entries
+        self._size = 0
+        self._clock = 0
+        self._lock = threading.Lock()
+        self.lookups = self.hits = self.near_misses = self.evictions = 0
+        self.seconds_saved = 0.0
+
+    def __len__(self):
+        return self._size
+
+    def lookup(self, key, thumb):
+        """Return (result, distance) for a matching entry, else (None, None)
+
+        key is a hash from phash() and thumb an image from thumbnail(). The
+        result is a copy, so callers may annotate it freely.
+        """
+        with self._lock:
+            self.lookups += 1
+            if not self._size:
+                return None, None
+            distances = hamming(self._hashes[:self._size], key)
+            candidates = np.flatnonzero(distances <= self.threshold)
+            candidates = candidates[np.argsort(distances[candidates], kind='stable')]
+            slot = next((int(slot) for slot in candidates
+                         if pixel_difference(thumb, self._thumbnails[slot]) <= self.pixel_threshold), None)
+            if slot is None:
+                self.near_misses += len(candidates) > 0
+                return None, None
+            self.hits += 1
+            self._clock += 1
+            self._last_used[slot] = self._clock
+            result, seconds = self._results[slot]
+            self.seconds_saved += seconds
+            return copy.deepcopy(result), int(distances[slot])
+
+    def store(self, key, thumb, result, seconds=0.0):
+        """Remember result for key and thumb; seconds is what producing it cost"""
+        if not self.max_entries:
+            return
+        with self._lock:
+            if self._size < self.max_entries:
+                slot = self._size
+                self._size += 1
+            else:
+                slot = int(self._last_used.argmin())
+                self.evictions += 1
+            self._clock += 1
+            self._hashes[slot] = key
+            self._thumbnails[slot] = thumb
+            self._last_used[slot] = self._clock
+            self._results[slot] = (copy.deepcopy(result), seconds)
+
+    def clear(self):
+        with self._lock:
+            self._size = 0
+            self._thumbnails = [None] * self.max_entries
+            self._results = [None] * self.max_entries
+
+    def stats(self):
+        return {
+            'entries': self._size,
+            'max_entries': self.max_entries,
+            'threshold': self.threshold,
+            'pixel_threshold': self.pixel_threshold,
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'hit_rate': round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+            'near_misses': self.near_misses,
+            'evictions': self.evictions,
+            'seconds_saved': round(self.seconds_saved, 3),
+        }
@@ -0,0 +1,106 @@
+import cv2
+import numpy as np
+
+# Longest side handed to EasyOCR; its detector works on a 2560px canvas
+# and ID text stays legible well below that
+OCR_MAX_SIDE = 1600
+
+# A detected document must cover this share of the frame to be cropped to
+MIN_DOCUMENT_AREA = 0.2
+
+# skimage.color.rgb2gray weights, in BGR order, so PassportEye sees the
+# same grayscale it would have produced from the file itself
+MRZ_GRAY_WEIGHTS = np.array([0.0721, 0.7154, 0.2125], dtype=np.float32)
+
+
+def decode_image(source):
+    """Decode a path, encoded bytes or BGR array into a BGR array"""
+    if isinstance(source, np.ndarray):
+        image = source
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        image = cv2.imdecode(np.frombuffer(source, np.uint8), cv2.IMREAD_COLOR)
+    else:
+        # np.fromfile + imdecode copes with non-ASCII paths on Windows
+        image = cv2.imdecode(np.fromfile(source, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"Could not decode image: {source!r:.80}")
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    return image
+
+
+def document_box(gray):
+    """Bounding box (x, y, w, h) of the document in the frame, or None
+
+    Only crops when the frame border is background, i.e. darker than the
+    Otsu threshold; scans and close-ups that fill the frame are left whole.
+    """
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    threshold, mask = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    edge = max(2, min(gray.shape) // 33)
+    border = np.concatenate([blurred[:edge].ravel(), blurred[-edge:].ravel(),
+                             blurred[:, :edge].ravel(), blurred[:, -edge:].ravel()])
+    if np.median(border) > threshold:
+        return None
+
+    # Close over table rules and text so the page is one blob
+    size = max(3, min(gray.shape) // 20)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, np.ones((size, size), np.uint8))
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+
+    x, y, w, h = cv2.boundingRect(max(contours, key=cv2.contourArea))
+    area = w * h / float(gray.shape[0] * gray.shape[1])
+    if not MIN_DOCUMENT_AREA <= area < 0.95:
+        return None
+    # Keep a small margin so edge text is not clipped
+    pad_x, pad_y = int(w * 0.02), int(h * 0.02)
+    x, y = max(0, x - pad_x), max(0, y - pad_y)
+    return x, y, min(gray.shape[1] - x, w + 2 * pad_x), min(gray.shape[0] - y, h + 2 * pad_y)
+
+
+class PreparedImage:
+    """An ID image decoded once, with the views each extractor needs
+
+    image is the full-resolution BGR frame. ocr is a grayscale copy
+    cropped to the document and scaled so its longest side is at most
+    max_side, which is what EasyOCR reads. mrz is the full-resolution
+    float grayscale PassportEye reads, built on first access.
+    """
+
+    def __init__(self, source, max_side=OCR_MAX_SIDE, crop=True):
+        self.image = decode_image(source)
+        self.gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+
+        box = document_box(self.gray) if crop else None
+        if box is not None:
+            x, y, w, h = box
+            roi = self.gray[y:y + h, x:x + w]
+        else:
+            roi = self.gray
+        self.roi = box
+
+        self.scale = min(1.0, max_side / float(max(roi.shape)))
+        if self.scale < 1.0:
+            roi = cv2.resize(roi, None, fx=self.scale, fy=self.scale,
+                             interpolation=cv2.INTER_AREA)
+        self.ocr = roi
+        self._mrz = None
+
+    @property
+    def shape(self):
+        return self.image.shape
+
+    @property
+    def mrz(self):
+        if self._mrz is None:
+            self._mrz = self.image.astype(np.float32) @ MRZ_GRAY_WEIGHTS / 255.0
+        return self._mrz
+
+
+def load_image(source, **options):
+    """Return a PreparedImage, decoding source unless it already is one"""
+    if isinstance(source, PreparedImage):
+        return source
+    return PreparedImage(source, **options)
@@ -0,0 +1,118 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+# Update this path to match your Tesseract installation, or set TESSERACT_CMD
+TESSERACT_CMD = os.getenv('TESSERACT_CMD', r'C:\Program Files\Tesseract-OCR\tesseract.exe')
+
+# EasyOCR readers kept loaded per process; each holds the model in memory
+POOL_SIZE = int(os.getenv('OCR_READER_POOL_SIZE', '1'))
+
+_mrz_reader = None
+_mrz_lock = threading.Lock()
+
+
+def mrz_reader():
+    """Import PassportEye and point pytesseract at Tesseract on first use
+
+    Returns read_mrz(img) for an already decoded float grayscale image,
+    so callers can skip PassportEye's own file loading.
+    """
+    global _mrz_reader
+    with _mrz_lock:
+        if _mrz_reader is None:
+            import pytesseract
+            from passporteye.mrz.image import MRZPipeline
+
+            pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+
+            def read_mrz(img):
+                pipeline = MRZPipeline(None)
+                pipeline['img'] = img  # takes the place of the file loader
+                return pipeline.result
+
+            _mrz_reader = read_mrz
+    return _mrz_reader
+
+
+class ReaderPool:
+    """EasyOCR readers loaded on first use and shared by worker threads
+
+    At most `size` readers are created; a thread that finds them all busy
+    waits for one to be returned. Readers cannot be shared between
+    processes, so each worker process keeps its own pool; call warm_up()
+    from the process pool initializer to pay the load cost once per worker.
+    """
+
+    def __init__(self, size=POOL_SIZE, languages=('en',)):
+        self.size = size
+        self.languages = list(languages)
+        self.load_seconds = []
+        self._idle = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        import easyocr
+
+        started = time.perf_counter()
+        reader = easyocr.Reader(self.languages)
+        self.load_seconds.append(time.perf_counter() - started)
+        return reader
+
+    def _create(self):
+        try:
+            return self._load()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    @contextmanager
+    def reader(self):
+        """Borrow a reader, loading one if the pool has not reached its size"""
+        try:
+            reader = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            reader = self._create() if create else self._idle.get()
+        try:
+            yield reader
+        finally:
+            self._idle.put(reader)
+
+    def warm_up(self):
+        """Load every reader now instead of on first use; returns load timings"""
+        with self._lock:
+            missing = self.size - self._created
+            self._created = self.size
+        for _ in range(missing):
+            try:
+                self._idle.put(self._load())
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self.stats()
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'loaded': len(self.load_seconds),
+            'idle': self._idle.qsize(),
+            'load_seconds': [round(seconds, 3) for seconds in self.load_seconds],
+        }
+
+
+pool = ReaderPool()
+
+
+def init_worker():
+    """Process pool initializer: import PassportEye and load the readers"""
+    mrz_reader()
+    pool.warm_up()
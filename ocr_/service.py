@@ -0,0 +1,194 @@
+import argparse
+import asyncio
+import collections
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from aiohttp import web
+
+import readers
+from app import dedupe_cache, extract_documents
+from preprocess import load_image
+
+MAX_UPLOAD_BYTES = 20 * 2 ** 20
+
+# Latencies kept for the percentiles reported by /metrics
+LATENCY_WINDOW = 1000
+
+
+def run_batch(payloads, batch_size):
+    """Executor side: decode each upload, then extract the good ones together
+
+    Returns (output, error) per payload so one unreadable upload does not
+    fail the rest of its batch.
+    """
+    images, results = [], []
+    for payload in payloads:
+        try:
+            images.append(load_image(payload))
+            results.append(None)
+        except Exception as e:
+            results.append((None, f"{type(e).__name__}: {e}"))
+
+    outputs = iter(extract_documents(images, batch_size))
+    return [result or (next(outputs), None) for result in results]
+
+
+class OCRService:
+    """Coalesces concurrent extraction requests into micro-batches
+
+    A request waits in a bounded queue; the batcher takes up to max_batch
+    requests, waiting at most max_wait seconds after the first for more
+    to arrive, and runs each batch on a thread pool so OCR never blocks
+    the event loop. When the queue is full new requests are refused with
+    503 instead of piling up.
+    """
+
+    def __init__(self, max_batch=8, max_wait=0.05, max_queue=64, workers=readers.POOL_SIZE):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.workers = workers
+        self.queue = asyncio.Queue(max_queue)
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='ocr')
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.counts = collections.Counter()
+        self.in_flight = 0
+        self._batcher = None
+
+    async def start(self, app=None):
+        self._slots = asyncio.Semaphore(self.workers)
+        self._batcher = asyncio.create_task(self._run())
+
+    async def stop(self, app=None):
+        if self._batcher is not None:
+            self._batcher.cancel()
+            await asyncio.gather(self._batcher, return_exceptions=True)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def submit(self, payload):
+        """Queue one upload and wait for its (output, error) pair"""
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((payload, future))  # raises QueueFull
+        return await future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            # Only take a batch once a worker is free, so requests keep
+            # coalescing in the queue while every worker is busy
+            await self._slots.acquire()
+            batch = await self._collect()
+            asyncio.create_task(self._process(batch))
+
+    async def _process(self, batch):
+        loop = asyncio.get_running_loop()
+        self.in_flight += len(batch)
+        self.counts['batches'] += 1
+        self.counts['batched_requests'] += len(batch)
+        try:
+            results = await loop.run_in_executor(
+                self.executor, run_batch, [payload for payload, _ in batch], self.max_batch)
+        except Exception as e:
+            results = [(None, f"{type(e).__name__}: {e}")] * len(batch)
+        finally:
+            self.in_flight -= len(batch)
+            self._slots.release()
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def handle_extract(self, request):
+        started = time.perf_counter()
+        if request.content_type.startswith('multipart/'):
+            reader = await request.multipart()
+            part = await reader.next()
+            payload = await part.read() if part is not None else b''
+        else:
+            payload = await request.read()
+        if not payload:
+            return web.json_response({'error': "empty upload"}, status=400)
+
+        try:
+            output, error = await self.submit(payload)
+        except asyncio.QueueFull:
+            self.counts['rejected'] += 1
+            return web.json_response({'error': "queue full, retry later"}, status=503,
+                                     headers={'Retry-After': '1'})
+
+        self.latencies.append(time.perf_counter() - started)
+        if error is not None:
+            self.counts['failed'] += 1
+            return web.json_response({'error': error}, status=422)
+        self.counts['completed'] += 1
+        return web.json_response(output)
+
+    async def handle_metrics(self, request):
+        return web.json_response(self.metrics())
+
+    def metrics(self):
+        latencies = np.array(self.latencies) * 1000
+        percentiles = {}
+        if len(latencies):
+            for q in (50, 90, 99):
+                percentiles[f'p{q}'] = round(float(np.percentile(latencies, q)), 1)
+        batches = self.counts['batches']
+        return {
+            'queue_depth': self.queue.qsize(),
+            'queue_capacity': self.queue.maxsize,
+            'in_flight': self.in_flight,
+            'latency_ms': percentiles,
+            'mean_batch_size': round(self.counts['batched_requests'] / batches, 2) if batches else 0.0,
+            'counts': dict(self.counts),
+            'readers': readers.pool.stats(),
+            'dedupe': dedupe_cache.stats(),
+        }
+
+
+def create_app(service=None, warm_up=False):
+    service = service or OCRService()
+    app = web.Application(client_max_size=MAX_UPLOAD_BYTES)
+    app['service'] = service
+    app.router.add_post('/extract', service.handle_extract)
+    app.router.add_get('/metrics', service.handle_metrics)
+    app.on_startup.append(service.start)
+    app.on_cleanup.append(service.stop)
+    if warm_up:
+        async def load_models(app):
+            await asyncio.get_running_loop().run_in_executor(service.executor, readers.init_worker)
+        app.on_startup.append(load_models)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve ID extraction over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-batch', type=int, default=8, help="requests per OCR batch")
+    parser.add_argument('--max-wait-ms', type=float, default=50,
+                        help="how long the first request in a batch waits for company")
+    parser.add_argument('--queue-size', type=int, default=64,
+                        help="waiting requests before new ones get 503")
+    parser.add_argument('--workers', type=int, default=readers.POOL_SIZE,
+                        help="batches run at once; match OCR_READER_POOL_SIZE")
+    parser.add_argument('--warm-up', action='store_true', help="load the OCR models before serving")
+    args = parser.parse_args(argv)
+
+    service = OCRService(args.max_batch, args.max_wait_ms / 1000, args.queue_size, args.workers)
+    web.run_app(create_app(service, args.warm_up), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
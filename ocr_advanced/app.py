@@ -1,20 +1,179 @@
+import cProfile
+import io
 import json
+import logging
+import os
+import pstats
 import time
-import fitz  # PyMuPDF
+import numpy as np
 import pdfplumber
-import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from itertools import chain
 
-from pathlib import Path
+from templates import GENERIC, detect_template
+
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever analyze() output changes so cached results are not reused
+ANALYZER_VERSION = '6'
+
+# Offending rows listed individually before the rest are summarised
+MAX_BALANCE_INDICATORS = 20
+
+# Share of consecutive rows that must reconcile before the captured column
+# is trusted to be a running balance; below it the layout was misread
+# (e.g. an empty credit column), which says nothing about tampering
+MIN_BALANCE_FIT = 0.5
+
+# Annotation subtypes PyMuPDF never reported through page.get_annots()
+IGNORED_ANNOT_SUBTYPES = {'Link', 'Widget'}
+
+
+def _annot_subtype(annot):
+    subtype = (annot.get('data') or {}).get('Subtype')
+    return getattr(subtype, 'name', subtype)
+
+
+def scan_page(page, timings=None):
+    """Run annotation, font and text extraction over one page in a single pass
+
+    If timings is given, seconds spent parsing the page layout, on the
+    integrity checks and on text extraction are added to it.
+    """
+    started = time.perf_counter()
+    # page.chars is materialised once and reused by extract_text below
+    chars = page.chars
+    parsed = time.perf_counter()
+    has_annots = any(
+        _annot_subtype(annot) not in IGNORED_ANNOT_SUBTYPES for annot in page.annots
+    )
+    fonts = {char['fontname'] for char in chars}
+    checked = time.perf_counter()
+    text = page.extract_text()
+    page.close()  # release cached layout objects before the next page
+
+    if timings is not None:
+        timings['parse'] += parsed - started
+        timings['integrity'] += checked - parsed
+        timings['text_extraction'] += time.perf_counter() - checked
+    return has_annots, fonts, text
+
+
+def seam_start(text, lines):
+    """Offset of the first line a transaction match could extend past
+
+    A transaction match touches at most `lines` non-blank lines (date,
+    description, amount), so only that many lines at the end of a page
+    can be affected by the text that follows it.
+    """
+    end = len(text)
+    seen = 0
+    while end > 0:
+        line_start = text.rfind('\n', 0, end) + 1
+        if text[line_start:end].strip():
+            seen += 1
+            if seen == lines:
+                return line_start
+        end = line_start - 1
+    return 0
+
+
+def match_page(text, template=GENERIC):
+    """Transaction matches on a single page as (start, end, groups)"""
+    return [(m.start(), m.end(), m.groups()) for m in template.transaction.finditer(text)]
+
+
+def make_transaction(row, template=GENERIC):
+    """Build the transaction dict for a matched (date, description, amount) row"""
+    date_str, description, amount = row[:3]
+    return {
+        'date': datetime.strptime(date_str, template.date_format).isoformat(),
+        'description': description.strip(),
+        'amount': float(amount.replace(',', ''))
+    }
+
+
+def scan_page_range(pdf_path, start, stop, template):
+    """Worker: scan pages [start, stop) and match transactions on each page"""
+    pages = []
+    timings = Counter()
+    started = time.perf_counter()
+    with pdfplumber.open(pdf_path, pages=range(start + 1, stop + 1)) as pdf:
+        timings['open'] += time.perf_counter() - started
+        for page in pdf.pages:
+            has_annots, fonts, text = scan_page(page, timings)
+            started = time.perf_counter()
+            pages.append((has_annots, fonts, text, match_page(text, template)))
+            timings['transactions'] += time.perf_counter() - started
+    return pages, timings
+
+
+def merge_page_matches(pages, template=GENERIC):
+    """Yield the transaction rows a scan of the joined page texts would find
+
+    pages is a sequence of (text, matches) where matches were found on
+    that page alone. Those only differ from a scan over the joined text
+    near page breaks, so just the seams are re-scanned here.
+    """
+    pattern = template.transaction
+    # carry holds the unconsumed end of the previous page plus one char
+    # before it, so anchors like ^ see the same context as in the joined text
+    carry = ''
+    start = 0
+    for text, matches in pages:
+        window = carry + text
+        offset = len(carry)
+        limit = seam_start(window, template.seam_lines)
+        local = {(s + offset, e + offset): i for i, (s, e, _) in enumerate(matches)}
+        pos = resume = start
+        while True:
+            m = pattern.search(window, pos)
+            if m is None or m.start() >= limit:
+                resume = pos
+                break
+            i = local.get(m.span())
+            if i is not None:
+                # Back in step with the page's own scan
+                for s, e, groups in matches[i:]:
+                    if s + offset >= limit:
+                        break
+                    yield groups
+                    resume = e + offset
+                break
+            yield m.groups()
+            pos = resume = m.end()
+        # Attempts before the seam failed regardless of what follows
+        cut = max(resume, limit)
+        if cut > 0:
+            carry, start = window[cut - 1:] + '\n', 1
+        else:
+            carry, start = window + '\n', 0
+
+    for m in pattern.finditer(carry[:-1], start):
+        yield m.groups()
 
-static_path = Path(config.STATIC_DIRECTORY)
-if not static_path.exists():
-    raise RuntimeError(f"Missing static directory: {static_path}. Please create it.")
 
 class BankStatementAnalyzer:
-    def __init__(self, pdf_path):
+    def __init__(self, pdf_path, workers=1, cache=None, template=None,
+                 profile=False, tracer=None):
         self.pdf_path = pdf_path
-        self.start_time = time.time()
+        self.template = template
+        self.forced_template = template
+        self.workers = workers or os.cpu_count()
+        self.cache = cache
+        # Opt-in diagnostics: cProfile the whole analysis and log the top
+        # functions, and/or call tracer(stage, seconds) as stages finish
+        self.profile = profile
+        self.tracer = tracer
+        self.timings = Counter()
+        self.page_count = 0
+        # Every transaction in statement order with its printed balance
+        self.ledger = []
+        self.balances = []
         self.metadata = {
             'accuracy_score': 100,
             'fraud_indicators': [],
@@ -27,48 +186,113 @@ class BankStatementAnalyzer:
             'metadata': self.metadata
         }
 
-    def analyze_pdf_integrity(self):
-        """Check PDF for signs of tampering"""
-        doc = fitz.open(self.pdf_path)
-        
+    @contextmanager
+    def stage(self, name):
+        """Time a block of the analysis under the given stage name"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_timing(name, time.perf_counter() - started)
+
+    def record_timing(self, name, seconds):
+        self.timings[name] += seconds
+        if self.tracer is not None:
+            self.tracer(name, seconds)
+
+    def record_page_timings(self, timings):
+        """Report per-page stage totals gathered by scan_page"""
+        for name, seconds in timings.items():
+            self.record_timing(name, seconds)
+
+    def scan_document(self, pdf):
+        """Single pass over every page; returns the page texts"""
+        annotated_pages = 0
+        fonts = set()
+        texts = []
+        timings = Counter()
+        for page in pdf.pages:
+            has_annots, page_fonts, text = scan_page(page, timings)
+            annotated_pages += has_annots
+            fonts |= page_fonts
+            texts.append(text)
+        self.record_page_timings(timings)
+
+        with self.stage('integrity'):
+            self.record_integrity(pdf.metadata, annotated_pages, fonts)
+        return texts
+
+    def select_template(self, first_page):
+        """Detect the statement template once, from the first page"""
+        if self.template is None:
+            self.template = detect_template(first_page)
+        return self.template
+
+    def scan_document_parallel(self, pdf):
+        """Page-parallel scan; returns the page texts and transaction rows"""
+        # The first page picks the template the workers parse with
+        timings = Counter()
+        has_annots, fonts, text = scan_page(pdf.pages[0], timings)
+        template = self.select_template(text)
+        first_page = (has_annots, fonts, text, match_page(text, template))
+
+        page_count = len(pdf.pages)
+        chunk = -(-(page_count - 1) // self.workers)
+        bounds = [(start, min(start + chunk, page_count))
+                  for start in range(1, page_count, chunk)]
+
+        with ProcessPoolExecutor(max_workers=len(bounds)) as pool:
+            futures = [pool.submit(scan_page_range, self.pdf_path, start, stop, template)
+                       for start, stop in bounds]
+            pages = [first_page]
+            for future in futures:
+                chunk_pages, chunk_timings = future.result()
+                pages.extend(chunk_pages)
+                timings.update(chunk_timings)
+        # Worker stages are summed across processes, i.e. CPU seconds
+        self.record_page_timings(timings)
+
+        with self.stage('integrity'):
+            annotated_pages = sum(has_annots for has_annots, _, _, _ in pages)
+            fonts = set().union(*(page_fonts for _, page_fonts, _, _ in pages))
+            self.record_integrity(pdf.metadata, annotated_pages, fonts)
+
+        texts = [text for _, _, text, _ in pages]
+        with self.stage('transactions'):
+            rows = list(merge_page_matches(
+                ((text, matches) for _, _, text, matches in pages), template))
+        return texts, rows
+
+    def record_integrity(self, doc_metadata, annotated_pages, fonts):
+        """Check PDF for signs of tampering from the collected page scan"""
         # Check for hidden layers or annotations
-        for page in doc:
-            if page.get_annots():
-                self.metadata['fraud_indicators'].append("Hidden annotations detected")
-                self.metadata['accuracy_score'] -= 15
+        for _ in range(annotated_pages):
+            self.metadata['fraud_indicators'].append("Hidden annotations detected")
+            self.metadata['accuracy_score'] -= 15
 
         # Check creation/modification dates
-        creation_date = doc.metadata.get('creationDate')
-        mod_date = doc.metadata.get('modDate')
+        creation_date = doc_metadata.get('CreationDate')
+        mod_date = doc_metadata.get('ModDate')
         if creation_date and mod_date and creation_date != mod_date:
             self.metadata['fraud_indicators'].append("PDF modification date mismatch")
             self.metadata['accuracy_score'] -= 20
 
         # Check for multiple font inconsistencies
-        with pdfplumber.open(self.pdf_path) as pdf:
-            fonts = set()
-            for page in pdf.pages:
-                chars = page.chars
-                for char in chars:
-                    fonts.add(char['fontname'])
-            
-            if len(fonts) > 5:  # Threshold for font variations
-                self.metadata['fraud_indicators'].append("Multiple font inconsistencies")
-                self.metadata['accuracy_score'] -= 25
+        if len(fonts) > 5:  # Threshold for font variations
+            self.metadata['fraud_indicators'].append("Multiple font inconsistencies")
+            self.metadata['accuracy_score'] -= 25
 
-        doc.close()
+    def analyze_pdf_integrity(self):
+        """Check PDF for signs of tampering"""
+        with pdfplumber.open(self.pdf_path) as pdf:
+            self.scan_document(pdf)
 
     def extract_identity_info(self, text):
         """Extract account holder information using regex patterns"""
-        patterns = {
-            'name': r"Account Name:\s*(.+)",
-            'number': r"Account Number:\s*(\d+)",
-            'bank': r"Bank Name:\s*(.+)",
-            'period': r"Statement Period:\s*(.+)"
-        }
+        template = self.select_template(text)
 
-        for field, pattern in patterns.items():
-            match = re.search(pattern, text)
+        for field, pattern in template.identity.items():
+            match = pattern.search(text)
             if match:
                 self.result['identity'][field] = match.group(1).strip()
             else:
@@ -77,23 +301,19 @@ class BankStatementAnalyzer:
 
     def extract_transactions(self, text):
         """Extract credit and debit transactions with enhanced pattern matching"""
-        transaction_pattern = r"""
-            (\d{2}-\w{3}-\d{4})  # Date
-            \s+(.*?)             # Description
-            \s+(-?\d{1,3}(?:,\d{3})*\.\d{2})  # Amount
-        """
-        
-        for match in re.finditer(transaction_pattern, text, re.VERBOSE):
-            date_str, description, amount = match.groups()
-            amount = float(amount.replace(',', ''))
-            
-            transaction = {
-                'date': datetime.strptime(date_str, "%d-%b-%Y").isoformat(),
-                'description': description.strip(),
-                'amount': amount
-            }
-
-            if amount > 0:
+        template = self.select_template(text)
+        self.record_transactions(m.groups() for m in template.transaction.finditer(text))
+
+    def record_transactions(self, rows):
+        """Classify matched (date, description, amount) rows as credit or debit"""
+        for row in rows:
+            row = self.template.normalize(row)
+            transaction = make_transaction(row, self.template)
+            balance = row[3] if len(row) > 3 else None
+            self.ledger.append(transaction)
+            self.balances.append(float(balance.replace(',', '')) if balance else np.nan)
+
+            if transaction['amount'] > 0:
                 self.result['credit_transactions'].append(transaction)
             else:
                 self.result['debit_transactions'].append(transaction)
@@ -103,22 +323,136 @@ class BankStatementAnalyzer:
             self.metadata['fraud_indicators'].append("No transactions detected")
             self.metadata['accuracy_score'] -= 30
 
+        self.reconcile_balances()
+
+    def reconcile_balances(self):
+        """Check prev_balance + amount == balance over the whole statement in one pass"""
+        if len(self.ledger) < 2 or not self.template.has_balance:
+            return
+
+        amounts = np.rint(np.array([t['amount'] for t in self.ledger]) * 100).astype(np.int64)
+        balances = np.array(self.balances)
+        printed = ~np.isnan(balances)
+        balances = np.rint(np.nan_to_num(balances) * 100).astype(np.int64)
+        pairs = printed[1:] & printed[:-1]
+        if not pairs.any():
+            return  # template or layout has no balance column
+
+        # Statements are printed oldest or newest first; keep the better fit
+        forward = pairs & (balances[:-1] + amounts[1:] != balances[1:])
+        backward = pairs & (balances[1:] + amounts[:-1] != balances[:-1])
+        if forward.sum() <= backward.sum():
+            offending = np.flatnonzero(forward) + 1
+        else:
+            offending = np.flatnonzero(backward)
+        if not len(offending):
+            return
+        if 1 - len(offending) / pairs.sum() < MIN_BALANCE_FIT:
+            return  # not a balance column
+
+        for row in offending[:MAX_BALANCE_INDICATORS].tolist():
+            self.metadata['fraud_indicators'].append(
+                f"Running balance mismatch at row {row + 1} ({self.ledger[row]['date'][:10]})")
+        if len(offending) > MAX_BALANCE_INDICATORS:
+            self.metadata['fraud_indicators'].append(
+                f"{len(offending) - MAX_BALANCE_INDICATORS} more running balance mismatches")
+        self.metadata['accuracy_score'] -= 30
+
+    def iter_transactions(self):
+        """Yield transactions page by page without keeping the statement in memory
+
+        Rows that run across a page break are yielded once the next page
+        has been read. Integrity checks are recorded in metadata when the
+        iterator is exhausted; self.result is left untouched.
+        """
+        annotated_pages = 0
+        fonts = set()
+
+        def texts(pdf):
+            nonlocal annotated_pages
+            for page in pdf.pages:
+                has_annots, page_fonts, text = scan_page(page, self.timings)
+                annotated_pages += has_annots
+                fonts.update(page_fonts)
+                self.page_count += 1
+                yield text
+
+        with pdfplumber.open(self.pdf_path) as pdf:
+            pages = texts(pdf)
+            first = next(pages, '')
+            template = self.select_template(first)
+            matched = ((text, match_page(text, template)) for text in chain([first], pages))
+            for row in merge_page_matches(matched, template):
+                yield make_transaction(template.normalize(row), template)
+            self.record_integrity(pdf.metadata, annotated_pages, fonts)
+
     def analyze(self):
         """Main analysis workflow"""
-        self.analyze_pdf_integrity()
-        
-        with pdfplumber.open(self.pdf_path) as pdf:
-            full_text = "\n".join(page.extract_text() for page in pdf.pages)
-            
+        if not self.profile:
+            return self.run_analysis()
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return self.run_analysis()
+        finally:
+            profiler.disable()
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(25)
+            logger.info("Profile of %s:\n%s", self.pdf_path, report.getvalue())
+
+    def run_analysis(self):
+        started = time.perf_counter()
+        if self.cache is not None:
+            with self.stage('cache'):
+                # A forced template can parse differently from the detected one
+                version = ANALYZER_VERSION
+                if self.forced_template is not None:
+                    version = f"{version}:{self.forced_template.name}"
+                key = self.cache.key_for(self.pdf_path, version)
+                cached = self.cache.get(key)
+            if cached is not None:
+                self.result = cached
+                self.metadata = cached['metadata']
+                self.page_count = self.metadata.get('page_count', 0)
+                self.metadata['processing_duration'] = round(time.perf_counter() - started, 2)
+                self.metadata['stage_timings'] = self.stage_timings()
+                return self.result
+
+        # Parse the document once; integrity checks and text share the page pass
+        with self.stage('open'):
+            pdf = pdfplumber.open(self.pdf_path)
+            page_count = len(pdf.pages)
+        with pdf:
+            if self.workers > 1 and page_count > 1:
+                texts, rows = self.scan_document_parallel(pdf)
+            else:
+                texts, rows = self.scan_document(pdf), None
+
+        self.page_count = len(texts)
+        self.select_template(texts[0] if texts else '')
+        full_text = "\n".join(texts)
+        with self.stage('identity'):
             self.extract_identity_info(full_text)
-            self.extract_transactions(full_text)
+        with self.stage('transactions'):
+            if rows is None:
+                self.extract_transactions(full_text)
+            else:
+                self.record_transactions(rows)
 
         # Finalize metadata
-        self.metadata['processing_duration'] = round(time.time() - self.start_time, 2)
+        self.metadata['processing_duration'] = round(time.perf_counter() - started, 2)
         self.metadata['accuracy_score'] = max(0, self.metadata['accuracy_score'])
-        
+        self.metadata['page_count'] = self.page_count
+        self.metadata['stage_timings'] = self.stage_timings()
+
+        if self.cache is not None:
+            self.cache.put(key, self.result)
         return self.result
 
+    def stage_timings(self):
+        return {name: round(seconds, 4) for name, seconds in self.timings.items()}
+
 # Usage Example
 if __name__ == "__main__":
     analyzer = BankStatementAnalyzer("AC_JOHN DOMINION ELEOJO_FEBRUARY 2025_641R010130868_FullStmt.pdf")
@@ -0,0 +1,128 @@
+import argparse
+import collections
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from app import BankStatementAnalyzer
+from cache import ResultCache
+
+
+def collect_statements(source):
+    """Return the PDF paths in a directory, or listed one per line in a manifest"""
+    source = Path(source)
+    if source.is_dir():
+        return sorted(str(path) for path in source.rglob('*') if path.suffix.lower() == '.pdf')
+
+    with open(source) as manifest:
+        return [line.strip() for line in manifest if line.strip() and not line.startswith('#')]
+
+
+_cache = None
+
+
+def init_worker(cache_dir):
+    global _cache
+    if cache_dir:
+        _cache = ResultCache(cache_dir)
+
+
+def analyze_statement(pdf_path):
+    """Worker: analyze one statement, turning any failure into an error record"""
+    started = time.time()
+    try:
+        analyzer = BankStatementAnalyzer(pdf_path, cache=_cache)
+        result = analyzer.analyze()
+        return {'file': pdf_path, 'status': 'ok', 'pages': analyzer.page_count,
+                'duration': round(time.time() - started, 2), 'result': result}
+    except Exception as e:
+        return {'file': pdf_path, 'status': 'error', 'pages': 0,
+                'duration': round(time.time() - started, 2),
+                'error': f"{type(e).__name__}: {e}"}
+
+
+def _run_pool(paths, workers, cache_dir, emit):
+    """Analyze paths in one pool; returns the paths left without a result if the pool broke"""
+    unfinished = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(cache_dir,)) as pool:
+        futures = {pool.submit(analyze_statement, path): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except BrokenProcessPool:  # a worker died, e.g. out of memory
+                unfinished.append(futures[future])
+                continue
+            except Exception as e:
+                record = {'file': futures[future], 'status': 'error', 'pages': 0,
+                          'error': f"{type(e).__name__}: {e}"}
+            emit(record)
+    return unfinished
+
+
+def run_batch(paths, out, workers=None, cache_dir=None):
+    """Fan statements out over a process pool and stream one JSON line each
+
+    When a worker dies the pool is rebuilt and every file without a result
+    is resubmitted. A file caught in two broken pools is then run in a pool
+    of its own, so a crash is only recorded against the file that caused it.
+    """
+    total = len(paths)
+    done = failed = pages = 0
+    started = time.time()
+
+    def emit(record):
+        nonlocal done, failed, pages
+        out.write(json.dumps(record) + '\n')
+        out.flush()
+
+        done += 1
+        failed += record['status'] != 'ok'
+        pages += record['pages']
+        elapsed = max(time.time() - started, 1e-9)
+        print(f"\r[{done}/{total}] {failed} failed, "
+              f"{done / elapsed:.2f} files/s, {pages / elapsed:.1f} pages/s",
+              end='', file=sys.stderr, flush=True)
+
+    crashes = collections.Counter()
+    remaining = list(paths)
+    while remaining:
+        for path in [path for path in remaining if crashes[path] >= 2]:
+            if _run_pool([path], 1, cache_dir, emit):
+                emit({'file': path, 'status': 'error', 'pages': 0,
+                      'error': "BrokenProcessPool: worker process died analyzing this file"})
+        shared = [path for path in remaining if crashes[path] < 2]
+        remaining = _run_pool(shared, workers, cache_dir, emit) if shared else []
+        crashes.update(remaining)
+
+    print(file=sys.stderr)
+    return {'files': done, 'failed': failed, 'pages': pages,
+            'duration': round(time.time() - started, 2)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze bank statements in bulk")
+    parser.add_argument('source', help="directory of PDFs or a manifest with one path per line")
+    parser.add_argument('-o', '--output', help="JSONL output file (default: stdout)")
+    parser.add_argument('-w', '--workers', type=int, help="worker processes (default: CPU count)")
+    parser.add_argument('--cache', help="directory of the shared result cache")
+    args = parser.parse_args(argv)
+
+    paths = collect_statements(args.source)
+    if args.output:
+        with open(args.output, 'w') as out:
+            summary = run_batch(paths, out, args.workers, args.cache)
+    else:
+        summary = run_batch(paths, sys.stdout, args.workers, args.cache)
+
+    if args.cache:
+        summary['cache'] = ResultCache(args.cache).stats()['shared']
+    print(json.dumps(summary), file=sys.stderr)
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
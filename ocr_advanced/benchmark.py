@@ -0,0 +1,273 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pdfplumber
+
+from app import ANALYZER_VERSION, BankStatementAnalyzer, scan_page
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+    import psutil
+
+DESCRIPTIONS = [
+    'SALARY CREDIT ACME NIGERIA LTD', 'POS PURCHASE SHOPRITE LEKKI', 'NIP TRANSFER TO ADA OKAFOR',
+    'AIRTIME MTN 08031234567', 'ATM WITHDRAWAL GTB YABA', 'USSD TRANSFER FROM EMEKA',
+    'DSTV SUBSCRIPTION', 'SMS ALERT CHARGES', 'LOAN REPAYMENT CARBON', 'WEB PURCHASE JUMIA',
+]
+
+# Standard 14 fonts need no embedding, so the generator has no dependencies
+FONTS = ['Helvetica', 'Times-Roman', 'Courier', 'Helvetica-Bold', 'Times-Bold', 'Courier-Bold']
+
+LAYOUTS = {
+    'generic': '%d-%b-%Y',
+    'numeric-date': '%d/%m/%Y',
+    'debit-credit': '%d-%b-%Y',
+}
+
+ROWS_PER_PAGE = 52
+
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def statement_lines(pages, layout, balance, rng):
+    """Text lines for each page of a synthetic statement"""
+    day = date(2024, 1, 1)
+    running = rng.randint(10_000, 500_000) * 100
+    lines = [[
+        "Account Name: ADAEZE JOHNSON",
+        "Account Number: 0123456789",
+        "Bank Name: SYNTHETIC BANK PLC",
+        "Statement Period: 01-Jan-2024 to 31-Dec-2024",
+        "",
+    ]]
+    if layout == 'debit-credit':
+        lines[0].append("Date Description Debit Credit Balance")
+    for page in range(pages):
+        if page:
+            lines.append([])
+        while len(lines[-1]) < ROWS_PER_PAGE:
+            amount = rng.randint(100, 25_000_000) * rng.choice((1, -1))
+            running += amount
+            if layout == 'debit-credit':
+                money = f"{max(-amount, 0) / 100:,.2f} {max(amount, 0) / 100:,.2f}"
+            else:
+                money = f"{amount / 100:,.2f}"
+            row = f"{day.strftime(LAYOUTS[layout])} {rng.choice(DESCRIPTIONS)} {money}"
+            if balance:
+                row += f" {running / 100:,.2f}"
+            lines[-1].append(row)
+            if rng.random() < 0.3:
+                day += timedelta(days=1)
+    return lines
+
+
+def write_statement(path, pages, layout='generic', fonts=1, annotated=0, balance=True,
+                    modified=False, seed=0):
+    """Write a synthetic statement PDF
+
+    fonts is how many of FONTS the rows cycle through, annotated how many
+    pages carry a text annotation and modified whether ModDate differs
+    from CreationDate.
+    """
+    rng = random.Random(seed)
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    page_tree = add(None)
+    font_refs = [add(f"<< /Type /Font /Subtype /Type1 /BaseFont /{name} >>".encode())
+                 for name in FONTS[:fonts]]
+    font_dict = ' '.join(f"/F{i} {ref} 0 R" for i, ref in enumerate(font_refs))
+
+    kids = []
+    for number, lines in enumerate(statement_lines(pages, layout, balance, rng)):
+        stream = ''.join(
+            f"BT /F{i % fonts} 9 Tf 40 {800 - 14 * i} Td ({_escape(line)}) Tj ET\n"
+            for i, line in enumerate(lines)
+        ).encode()
+        content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        annots = ''
+        if number < annotated:
+            note = add(b"<< /Type /Annot /Subtype /Text /Rect [500 780 520 800] "
+                       b"/Contents (edited) >>")
+            annots = f" /Annots [{note} 0 R]"
+        kids.append(add(
+            f"<< /Type /Page /Parent {page_tree} 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << {font_dict} >> >> /Contents {content} 0 R{annots} >>".encode()
+        ))
+
+    objects[catalog - 1] = f"<< /Type /Catalog /Pages {page_tree} 0 R >>".encode()
+    objects[page_tree - 1] = (f"<< /Type /Pages /Count {len(kids)} "
+                              f"/Kids [{' '.join(f'{k} 0 R' for k in kids)}] >>").encode()
+    mod_date = 'D:20250301090000' if modified else 'D:20250201090000'
+    info = add(f"<< /Producer (creditech benchmark) /CreationDate (D:20250201090000) "
+               f"/ModDate ({mod_date}) >>".encode())
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b''.join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += (b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(objects) + 1, catalog, info, xref))
+
+    with open(path, 'wb') as f:
+        f.write(out)
+
+
+def _peak_rss_mb():
+    if resource is not None:
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20
+    return psutil.Process().memory_info().peak_wset / 2 ** 20
+
+
+def _timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def measure(pdf_path, pages, repeat, workers):
+    """Time each analyzer stage on one statement; runs in a fresh process"""
+    with pdfplumber.open(pdf_path) as pdf:
+        text = "\n".join(scan_page(page)[2] for page in pdf.pages)
+
+    def stage(method, *args):
+        return lambda: getattr(BankStatementAnalyzer(pdf_path), method)(*args)
+
+    timings = {
+        'analyze_pdf_integrity': _timed(stage('analyze_pdf_integrity'), repeat),
+        'extract_identity_info': _timed(stage('extract_identity_info', text), repeat),
+        'extract_transactions': _timed(stage('extract_transactions', text), repeat),
+    }
+
+    analyzer = None
+
+    def end_to_end():
+        nonlocal analyzer
+        analyzer = BankStatementAnalyzer(pdf_path, workers=workers)
+        analyzer.analyze()
+
+    timings['analyze'] = _timed(end_to_end, repeat)
+    return {
+        'seconds': {name: round(seconds, 6) for name, seconds in timings.items()},
+        'pages_per_second': round(pages / timings['analyze'], 2),
+        'rows_per_second': round(len(analyzer.ledger) / timings['extract_transactions'], 1),
+        'template': analyzer.template.name,
+        'transactions': len(analyzer.ledger),
+    }
+
+
+def peak_rss(pdf_path, workers):
+    """Peak RSS of one analyze() call; runs in a fresh process that does nothing else"""
+    BankStatementAnalyzer(pdf_path, workers=workers).analyze()
+    return round(_peak_rss_mb(), 1)
+
+
+def _run_case(args):
+    return measure(*args)
+
+
+def _run_peak_rss(args):
+    return peak_rss(*args)
+
+
+SUITES = {
+    'quick': [dict(pages=p) for p in (1, 10, 40)],
+    'full': (
+        [dict(pages=p) for p in (1, 10, 40, 100, 250, 500)]
+        + [dict(pages=40, layout='numeric-date')]
+        + [dict(pages=40, layout='debit-credit')]
+        + [dict(pages=40, balance=False)]
+        + [dict(pages=40, fonts=6, annotated=5, modified=True)]
+    ),
+}
+
+
+def run_suite(cases, repeat=3, workers=1, seed=0):
+    results = []
+    # maxtasksperchild=1 gives every task its own process; peak RSS is read
+    # in a process that only runs analyze(), not the timing harness
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp, context.Pool(1, maxtasksperchild=1) as pool:
+        for case in cases:
+            case = {'layout': 'generic', 'fonts': 1, 'annotated': 0, 'balance': True,
+                    'modified': False, **case}
+            path = os.path.join(tmp, 'statement.pdf')
+            write_statement(path, seed=seed, **case)
+            result = pool.apply(_run_case, ((path, case['pages'], repeat, workers),))
+            result['peak_rss_mb'] = pool.apply(_run_peak_rss, ((path, workers),))
+            results.append({'case': case, **result})
+            print(f"{case['pages']:>4} pages {case['layout']:<13} "
+                  f"{result['pages_per_second']:>8.1f} pages/s "
+                  f"{result['peak_rss_mb']:>7.1f} MB", file=sys.stderr)
+    return results
+
+
+def compare(current, baseline):
+    """Print the end-to-end time of each case relative to a previous run"""
+    previous = {json.dumps(r['case'], sort_keys=True): r for r in baseline['results']}
+    for result in current['results']:
+        before = previous.get(json.dumps(result['case'], sort_keys=True))
+        if before is None:
+            continue
+        ratio = result['seconds']['analyze'] / before['seconds']['analyze']
+        print(f"{result['case']['pages']:>4} pages {result['case']['layout']:<13} "
+              f"{ratio:6.2f}x time vs baseline ({before['analyzer_version']} -> "
+              f"{result['analyzer_version']})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark BankStatementAnalyzer on synthetic statements")
+    parser.add_argument('--suite', choices=sorted(SUITES), default='quick')
+    parser.add_argument('--repeat', type=int, default=3, help="runs per stage, best is kept")
+    parser.add_argument('--workers', type=int, default=1, help="workers for end-to-end analyze()")
+    parser.add_argument('-o', '--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help="previous results file to compare against")
+    args = parser.parse_args(argv)
+
+    results = run_suite(SUITES[args.suite], args.repeat, args.workers)
+    for result in results:
+        result['analyzer_version'] = ANALYZER_VERSION
+    report = {
+        'analyzer_version': ANALYZER_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'pdfplumber': pdfplumber.__version__,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
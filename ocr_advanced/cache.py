@@ -0,0 +1,92 @@
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+
+def content_hash(pdf_path, chunk_size=1 << 20):
+    """SHA-256 of the file contents"""
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Size-bounded on-disk cache of analysis results keyed by PDF content
+
+    Entries live in a SQLite database so several worker processes can read
+    and write the same cache safely. Once the stored results exceed
+    max_bytes the least recently used entries are evicted.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.db = sqlite3.connect(Path(directory) / 'results.sqlite3', timeout=30,
+                                  isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS results (
+            key TEXT PRIMARY KEY, value TEXT NOT NULL,
+            size INTEGER NOT NULL, last_access REAL NOT NULL)''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS results_lru ON results (last_access)')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS stats (
+            name TEXT PRIMARY KEY, value INTEGER NOT NULL)''')
+
+    def key_for(self, pdf_path, version):
+        return f"{content_hash(pdf_path)}:{version}"
+
+    def _count(self, name):
+        self.db.execute('''INSERT INTO stats (name, value) VALUES (?, 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1''', (name,))
+
+    def get(self, key):
+        """Return the stored result for key, or None"""
+        row = self.db.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            self._count('misses')
+            return None
+
+        self.db.execute('UPDATE results SET last_access = ? WHERE key = ?', (time.time(), key))
+        self.hits += 1
+        self._count('hits')
+        return json.loads(row[0])
+
+    def put(self, key, result):
+        """Store a result and evict least recently used entries past max_bytes"""
+        value = json.dumps(result)
+        with self.db:
+            self.db.execute('BEGIN IMMEDIATE')
+            self.db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)',
+                            (key, value, len(value), time.time()))
+            total = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(total - self.max_bytes)
+
+    def _evict(self, excess):
+        freed = 0
+        stale = []
+        for key, size in self.db.execute('SELECT key, size FROM results ORDER BY last_access'):
+            if freed >= excess:
+                break
+            stale.append((key,))
+            freed += size
+        self.db.executemany('DELETE FROM results WHERE key = ?', stale)
+        self.db.execute('''INSERT INTO stats (name, value) VALUES ('evictions', ?)
+            ON CONFLICT(name) DO UPDATE SET value = value + excluded.value''', (len(stale),))
+
+    def stats(self):
+        """Counters for this process plus the totals shared by all processes"""
+        shared = dict(self.db.execute('SELECT name, value FROM stats'))
+        entries, size = self.db.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries,
+                'bytes': size, 'shared': shared}
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,123 @@
+import numpy as np
+
+
+class TransactionColumns:
+    """Compact columnar view of extracted transactions
+
+    dates are datetime64[D], amounts are int64 kobo and descriptions are
+    interned into a vocabulary so each row stores an int32 code. Build it
+    from an analyze() result or straight from iter_transactions().
+    """
+
+    def __init__(self, dates, amounts, codes, vocabulary):
+        self.dates = dates
+        self.amounts = amounts
+        self.codes = codes
+        self.vocabulary = vocabulary
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        """Build columns from an iterable of transaction dicts"""
+        dates = []
+        amounts = []
+        codes = []
+        interned = {}
+        for transaction in transactions:
+            dates.append(transaction['date'][:10])
+            amounts.append(transaction['amount'])
+            codes.append(interned.setdefault(transaction['description'], len(interned)))
+
+        return cls(
+            np.array(dates, dtype='datetime64[D]'),
+            np.rint(np.array(amounts, dtype=np.float64) * 100).astype(np.int64),
+            np.array(codes, dtype=np.int32),
+            np.array(list(interned), dtype=object),
+        )
+
+    @classmethod
+    def from_result(cls, result):
+        """Build columns from the dict returned by BankStatementAnalyzer.analyze()"""
+        return cls.from_transactions(result['credit_transactions'] + result['debit_transactions'])
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def to_dicts(self):
+        """Return the credit/debit dict lists analyze() produces"""
+        dates = np.datetime_as_string(self.dates.astype('datetime64[s]'))
+        descriptions = self.vocabulary[self.codes]
+        credit, debit = [], []
+        for date, description, amount in zip(dates, descriptions, self.amounts.tolist()):
+            transaction = {'date': str(date), 'description': description, 'amount': amount / 100}
+            (credit if amount > 0 else debit).append(transaction)
+        return {'credit_transactions': credit, 'debit_transactions': debit}
+
+    def _chronological(self):
+        return np.argsort(self.dates, kind='stable')
+
+    def monthly_flows(self):
+        """Total inflow and outflow in kobo per calendar month"""
+        months, index = np.unique(self.dates.astype('datetime64[M]'), return_inverse=True)
+        inflow = np.bincount(index, weights=np.where(self.amounts > 0, self.amounts, 0),
+                             minlength=len(months))
+        outflow = np.bincount(index, weights=np.where(self.amounts < 0, -self.amounts, 0),
+                              minlength=len(months))
+        return {
+            'months': months,
+            'inflow': inflow.astype(np.int64),
+            'outflow': outflow.astype(np.int64),
+        }
+
+    def running_balance(self, opening_balance=0):
+        """Dates and running balance in kobo, in chronological order"""
+        order = self._chronological()
+        return self.dates[order], opening_balance + np.cumsum(self.amounts[order])
+
+    def recurring_credits(self, min_months=3, tolerance=0.1):
+        """Salary-like credits: same description in at least min_months distinct
+        months with amounts within tolerance of their mean"""
+        credit = self.amounts > 0
+        codes = self.codes[credit]
+        amounts = self.amounts[credit]
+        if not len(codes):
+            return []
+
+        size = len(self.vocabulary)
+        months = self.dates[credit].astype('datetime64[M]').astype(np.int64)
+        pairs = np.unique(np.stack([codes, months]), axis=1)
+        month_counts = np.bincount(pairs[0], minlength=size)
+
+        counts = np.bincount(codes, minlength=size)
+        totals = np.bincount(codes, weights=amounts, minlength=size)
+        lowest = np.full(size, np.iinfo(np.int64).max)
+        highest = np.zeros(size, dtype=np.int64)
+        np.minimum.at(lowest, codes, amounts)
+        np.maximum.at(highest, codes, amounts)
+
+        mean = np.divide(totals, counts, out=np.zeros(size), where=counts > 0)
+        steady = (highest - lowest) <= tolerance * mean
+        selected = np.flatnonzero((month_counts >= min_months) & steady)
+        return [
+            {
+                'description': self.vocabulary[code],
+                'months': int(month_counts[code]),
+                'average_amount': int(round(mean[code])),
+            }
+            for code in selected[np.argsort(-mean[selected], kind='stable')]
+        ]
+
+    def top_counterparties(self, n=10, direction='outflow'):
+        """Descriptions with the largest total flow in kobo; direction is
+        'inflow', 'outflow' or 'volume'"""
+        if direction == 'inflow':
+            weights = np.where(self.amounts > 0, self.amounts, 0)
+        elif direction == 'outflow':
+            weights = np.where(self.amounts < 0, -self.amounts, 0)
+        elif direction == 'volume':
+            weights = np.abs(self.amounts)
+        else:
+            raise ValueError(f"Unknown direction: {direction}")
+
+        totals = np.bincount(self.codes, weights=weights, minlength=len(self.vocabulary))
+        top = np.argsort(-totals, kind='stable')[:n]
+        return [(self.vocabulary[code], int(totals[code])) for code in top if totals[code] > 0]
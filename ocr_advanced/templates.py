@@ -0,0 +1,118 @@
+import re
+
+
+class StatementTemplate:
+    """Precompiled patterns for one family of statement layouts
+
+    transaction must capture (date, description, amount, balance) in that
+    order, balance being optional, and may touch at most seam_lines
+    non-blank lines, which is what the page-break handling in
+    app.merge_page_matches relies on. A layout whose columns differ, e.g.
+    separate debit and credit columns, captures its own groups and passes
+    row, a function turning them into that 4-tuple. has_balance says
+    whether the layout prints a running balance at all; reconciliation
+    only runs for templates that declare one.
+    """
+
+    def __init__(self, name, detect, identity, transaction, date_format,
+                 flags=0, seam_lines=3, row=None, has_balance=True):
+        self.name = name
+        self.detect = re.compile(detect) if detect else None
+        self.identity = {field: re.compile(pattern) for field, pattern in identity.items()}
+        self.transaction = re.compile(transaction, re.VERBOSE | flags)
+        self.date_format = date_format
+        self.seam_lines = seam_lines
+        self.row = row
+        self.has_balance = has_balance
+
+    def normalize(self, groups):
+        """(date, description, amount, balance) from a transaction match's groups"""
+        return self.row(groups) if self.row is not None else groups
+
+    def __repr__(self):
+        return f"StatementTemplate({self.name!r})"
+
+    def matches(self, first_page):
+        return self.detect is not None and self.detect.search(first_page) is not None
+
+
+DEFAULT_IDENTITY = {
+    'name': r"Account Name:\s*(.+)",
+    'number': r"Account Number:\s*(\d+)",
+    'bank': r"Bank Name:\s*(.+)",
+    'period': r"Statement Period:\s*(.+)"
+}
+
+GENERIC = StatementTemplate(
+    'generic',
+    detect=None,
+    identity=DEFAULT_IDENTITY,
+    transaction=r"""
+        (\d{2}-\w{3}-\d{4})  # Date
+        \s+(.*?)             # Description
+        \s+(-?\d{1,3}(?:,\d{3})*\.\d{2})  # Amount
+        (?:[ \t]+(-?\d{1,3}(?:,\d{3})*\.\d{2}))?  # Balance, same line
+    """,
+    date_format="%d-%b-%Y",
+)
+
+# Rows dated 31/01/2025 instead of 31-Jan-2025
+NUMERIC_DATE = StatementTemplate(
+    'numeric-date',
+    detect=r"(?m)^\d{2}/\d{2}/\d{4}\s",
+    identity=DEFAULT_IDENTITY,
+    transaction=r"""
+        ^(\d{2}/\d{2}/\d{4})  # Date at the start of a row
+        \s+(.*?)              # Description
+        \s+(-?\d{1,3}(?:,\d{3})*\.\d{2})  # Amount
+        (?:[ \t]+(-?\d{1,3}(?:,\d{3})*\.\d{2}))?  # Balance, same line
+    """,
+    date_format="%d/%m/%Y",
+    flags=re.MULTILINE,
+)
+
+AMOUNT = r"-?\d{1,3}(?:,\d{3})*\.\d{2}"
+
+
+def _amount(text):
+    return 0.0 if text in (None, '-') else float(text.replace(',', ''))
+
+
+def _debit_credit_row(groups):
+    date_str, description, debit, credit, balance = groups
+    return date_str, description, f"{_amount(credit) - abs(_amount(debit)):.2f}", balance
+
+
+# Date | Description | Debit | Credit | Balance, the usual bank layout. The
+# empty cell of each row must be printed (0.00 or -) for the columns to be
+# told apart in extracted text
+DEBIT_CREDIT = StatementTemplate(
+    'debit-credit',
+    detect=r"(?im)^.*\b(?:debits?|withdrawals?)\b.*\b(?:credits?|deposits?|lodgements?)\b.*\bbalance\b",
+    identity=DEFAULT_IDENTITY,
+    transaction=rf"""
+        (\d{{2}}-\w{{3}}-\d{{4}})  # Date
+        \s+(.*?)                # Description
+        [ \t]+({AMOUNT}|-)      # Debit
+        [ \t]+({AMOUNT}|-)      # Credit
+        [ \t]+({AMOUNT})        # Balance
+    """,
+    date_format="%d-%b-%Y",
+    row=_debit_credit_row,
+)
+
+# Checked in order against the first page; GENERIC is the fallback
+TEMPLATES = [DEBIT_CREDIT, NUMERIC_DATE]
+
+
+def register_template(template):
+    """Add a template, taking precedence over those already registered"""
+    TEMPLATES.insert(0, template)
+
+
+def detect_template(first_page):
+    """Pick the template for a statement from the text of its first page"""
+    for template in TEMPLATES:
+        if template.matches(first_page):
+            return template
+    return GENERIC
@@ -4,6 +4,7 @@ import requests
 from bs4 import BeautifulSoup
 from typing import List, Dict, Any, Optional
 from langchain.schema import Document
+from dev_assistant.crawler import extract_api_info
 import json
 
 class DocumentScraper:
@@ -133,50 +134,8 @@ class DocumentScraper:
     
     def _extract_api_info(self, content) -> Dict[str, Any]:
         """Extract API information from the content"""
-        api_info = {
-            "endpoints": [],
-            "methods": [],
-            "parameters": []
-        }
-        
-        # Look for API endpoints in code blocks
-        code_blocks = content.find_all('pre')
-        for block in code_blocks:
-            code = block.get_text()
-            # Look for HTTP methods and URLs
-            endpoint_matches = re.findall(r'(GET|POST|PUT|DELETE|PATCH)\s+(/\S+)', code)
-            for method, endpoint in endpoint_matches:
-                api_info["endpoints"].append(endpoint)
-                api_info["methods"].append(method)
-            
-            # Look for parameters in code or tables
-            param_matches = re.findall(r'["\']([\w_]+)["\']:\s*(?:["\'](.*?)["\']|(\d+))', code)
-            for param, string_value, num_value in param_matches:
-                value = string_value or num_value
-                api_info["parameters"].append({"name": param, "example": value})
-                
-        # Also look for tables which often contain API parameters
-        tables = content.find_all('table')
-        for table in tables:
-            rows = table.find_all('tr')
-            headers = [th.get_text().strip().lower() for th in rows[0].find_all(['th', 'td'])] if rows else []
-            
-            if 'parameter' in headers or 'name' in headers:
-                name_index = headers.index('parameter') if 'parameter' in headers else headers.index('name')
-                for row in rows[1:]:
-                    cells = row.find_all(['td', 'th'])
-                    if len(cells) > name_index:
-                        param_name = cells[name_index].get_text().strip()
-                        param_info = {"name": param_name}
-                        
-                        # Look for description, type, required fields
-                        for i, header in enumerate(headers):
-                            if i < len(cells) and i != name_index:
-                                param_info[header] = cells[i].get_text().strip()
-                                
-                        api_info["parameters"].append(param_info)
-                        
-        return api_info
+        # Shared with the dev_assistant crawler, which indexes the same fields
+        return extract_api_info(content)
 
 # Example usage
 if __name__ == "__main__":